@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+GROUP_BY_FIELDS = {
+    'author': lambda work_log, issue: work_log.author,
+    'issue': lambda work_log, issue: work_log.issue_key,
+    'parent': lambda work_log, issue: issue.parent_key or "",
+    'day': lambda work_log, issue: work_log.started.strftime('%Y-%m-%d'),
+    'week': lambda work_log, issue: "{0}-W{1:02d}".format(*work_log.started.isocalendar()),
+    'month': lambda work_log, issue: work_log.started.strftime('%Y-%m')
+}
+
+
+def parse_group_by(group_by):
+    """Parse a comma separated list of group by fields
+
+    :param group_by: the comma separated fields, e.g. "author,parent,week"
+    :return: the list of fields
+    """
+    fields = [field.strip() for field in group_by.split(',') if field.strip()]
+    unknown_fields = [field for field in fields if field not in GROUP_BY_FIELDS]
+    if unknown_fields or not fields:
+        raise ValueError("Invalid group by fields " + str(unknown_fields or [group_by]) + ", choose from " +
+                         ", ".join(GROUP_BY_FIELDS))
+    return fields
+
+
+def aggregate_work_logs(issues, work_logs, group_by):
+    """Sum the time spent of the work logs per group
+
+    The sums are computed in a single pass over the work logs.
+
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the iterable of work logs
+    :param group_by: the list of fields to group by
+    :return: a sorted list of tuples of the group values and the total time spent in seconds
+    """
+    group_functions = [GROUP_BY_FIELDS[field] for field in group_by]
+    totals = {}
+    for work_log in work_logs:
+        issue = issues[work_log.issue_key]
+        group = tuple(group_function(work_log, issue) for group_function in group_functions)
+        totals[group] = totals.get(group, 0) + work_log.time_spent
+
+    return sorted(totals.items())
+
+
+def pivot_work_logs(issues, work_logs, group_by, pivot):
+    """Sum the time spent of the work logs per group in the rows and per pivot value in the columns
+
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the iterable of work logs
+    :param group_by: the list of fields to group the rows by
+    :param pivot: the field of which the values become the columns, e.g. "day"
+    :return: a tuple of the sorted list of column values and a sorted list of tuples of the group values and a dict
+    with the total time spent in seconds per column value
+    """
+    pivot_function = GROUP_BY_FIELDS[pivot]
+    group_functions = [GROUP_BY_FIELDS[field] for field in group_by]
+    columns = set()
+    rows = {}
+    for work_log in work_logs:
+        issue = issues[work_log.issue_key]
+        group = tuple(group_function(work_log, issue) for group_function in group_functions)
+        column = pivot_function(work_log, issue)
+        columns.add(column)
+        row = rows.setdefault(group, {})
+        row[column] = row.get(column, 0) + work_log.time_spent
+
+    return sorted(columns), sorted(rows.items())
+
+
+def aggregation_to_table(group_by, aggregation):
+    """Convert an aggregation into a table with a header
+
+    :param group_by: the list of fields the aggregation has been grouped by
+    :param aggregation: the result of aggregate_work_logs
+    :return: a tuple of the header and the list of rows, the time spent is in seconds
+    """
+    header = group_by + ['time_spent']
+    rows = [list(group) + [time_spent] for group, time_spent in aggregation]
+    return header, rows
+
+
+def pivot_to_table(group_by, columns, pivot_rows):
+    """Convert a pivot into a table with a header, empty cells are None
+
+    :param group_by: the list of fields the rows have been grouped by
+    :param columns: the column values as returned by pivot_work_logs
+    :param pivot_rows: the rows as returned by pivot_work_logs
+    :return: a tuple of the header and the list of rows, the time spent is in seconds
+    """
+    header = group_by + columns + ['total']
+    rows = []
+    for group, time_spent_per_column in pivot_rows:
+        rows.append(list(group) +
+                    [time_spent_per_column.get(column) for column in columns] +
+                    [sum(time_spent_per_column.values())])
+    return header, rows
+
+
+def format_table_row(row):
+    """Format the time spent of a table row as text, e.g. 1:30:00, empty cells become blank
+
+    :param row: the row as returned by aggregation_to_table or pivot_to_table
+    :return: the list of text cells
+    """
+    return ["" if cell is None else str(timedelta(seconds=cell)) if isinstance(cell, int) else cell for cell in row]
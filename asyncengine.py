@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime
+import ssl
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+from issue import IssueIndex
+from jsondecoder import get_json_decoder
+from jiratimereport import ASYNC_CONCURRENCY, convert_json_to_issues, convert_json_to_work_logs, convert_to_date, \
+    get_search_params, get_updated_issues_jql, get_work_log_params
+from requestscheduler import RequestScheduler
+
+
+class AsyncJiraClient:
+    """An AsyncJiraClient object will hold the connection settings of a Jira server and an asynchronous HTTP client
+
+    The requests are multiplexed over a single HTTP/2 connection when the h2 package is installed and the server
+    negotiates HTTP/2 over TLS, otherwise they use a pool of HTTP/1.1 keep-alive connections, one per request in flight.
+    The httpx package is required.
+    """
+    def __init__(self, jira_url, user_name, api_token, ssl_certificate, concurrency=ASYNC_CONCURRENCY, scheduler=None,
+                 metrics=None, json_decoder=None):
+        """
+        :param jira_url: The base Jira URL
+        :param user_name The user name to use for connecting to Jira
+        :param api_token The API token to use for connecting to Jira
+        :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+        :param concurrency The maximum number of requests in flight
+        :param scheduler The request scheduler, by default one without rate limit
+        :param metrics The metrics recording the latency and size of every request, None to record nothing
+        :param json_decoder The function decoding the bytes of a JSON response, by default the fastest one installed
+        """
+        if httpx is None:
+            raise ImportError("The async engine requires the httpx package, install it by means of "
+                              "pip install httpx[http2]")
+
+        # HTTP/2 is only negotiated over TLS
+        http2 = h2 is not None and jira_url.startswith("https:")
+        self.scheduler = scheduler or RequestScheduler(max_in_flight=concurrency)
+        self.metrics = metrics
+        self.decode_json = json_decoder or get_json_decoder()
+        self.semaphore = asyncio.Semaphore(max(concurrency, 1))
+        # The server may not negotiate HTTP/2, so the pool allows a connection per request in flight. The requests
+        # sent while an HTTP/2 connection is set up wait for it and share it, so no other connections are opened then.
+        limits = httpx.Limits(max_connections=max(concurrency, 1), max_keepalive_connections=max(concurrency, 1))
+        verify = ssl.create_default_context(cafile=ssl_certificate) if ssl_certificate else True
+        self.client = httpx.AsyncClient(base_url=jira_url,
+                                        auth=(user_name, api_token),
+                                        headers={"Accept": "application/json"},
+                                        verify=verify,
+                                        http2=http2,
+                                        limits=limits)
+
+    async def get_request(self, url, params):
+        """Perform the GET request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the complete response as returned from the Jira API
+        """
+        def send():
+            return self.client.get(url, params=params)
+
+        if self.metrics:
+            send = self.metrics.measure_request_async(url, send)
+        async with self.semaphore:
+            response = await self.scheduler.execute_async(send, (httpx.TransportError,))
+        response.raise_for_status()
+        return response
+
+    async def get_json(self, url, params):
+        """Perform the GET request to the Jira server and decode the JSON response
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the decoded JSON response
+        """
+        return self.decode_json((await self.get_request(url, params)).content)
+
+    async def close(self):
+        """Close the connections of the client
+        """
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+async def get_updated_issues_async(jira_client, project, from_date, to_date, authors=None):
+    """Retrieve the updated issues from Jira
+
+    The first page is retrieved to learn the total number of issues and the page size, after which all other pages are
+    retrieved in parallel.
+
+    :param jira_client: The asynchronous client to use for connecting to Jira
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors The account IDs or user names of the authors to retrieve the issues for, None for all authors
+    :return: an index of the issues keyed by issue key
+    """
+    jql = get_updated_issues_jql(project, from_date, to_date, authors)
+
+    async def get_page(start_at):
+        return await jira_client.get_json("/rest/api/2/search", get_search_params(jql, start_at))
+
+    first_page = await get_page(0)
+    max_results = int(first_page['maxResults'])
+    other_pages = await asyncio.gather(*(get_page(start_at) for start_at in
+                                         range(max_results, int(first_page['total']), max(max_results, 1))))
+
+    issues = IssueIndex()
+    for page in [first_page] + other_pages:
+        for issue in convert_json_to_issues(page):
+            issues.add(issue)
+
+    return issues
+
+
+async def get_issue_work_logs_async(jira_client, from_date, to_date, issue, authors=None):
+    """Retrieve the work logs of a single issue from Jira
+
+    :param jira_client: The asynchronous client to use for connecting to Jira
+    :param from_date The date to start the time report as a datetime
+    :param to_date The date to end the time report (exclusive) as a datetime
+    :param issue: the issue to retrieve the work logs for
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :return: the list of work logs of the issue
+    """
+    work_logs = []
+    start_at = 0
+    while True:
+        url = "/rest/api/2/issue/" + issue.key + "/worklog/"
+        response_json = await jira_client.get_json(url, get_work_log_params(from_date, to_date, start_at))
+        work_logs.extend(convert_json_to_work_logs(issue.key, response_json, from_date, to_date, authors))
+
+        # Verify whether it is necessary to invoke the API request again because of pagination
+        max_number_of_work_logs_processed = start_at + int(response_json['maxResults'])
+        if max_number_of_work_logs_processed < int(response_json['total']):
+            start_at = max_number_of_work_logs_processed
+        else:
+            break
+
+    return work_logs
+
+
+async def get_work_logs_async(jira_client, from_date, to_date, issues, authors=None):
+    """Retrieve the work logs of the issues from Jira concurrently
+
+    The number of requests in flight is bounded by the concurrency of the client. The work logs are returned in the
+    order of the issues.
+
+    :param jira_client: The asynchronous client to use for connecting to Jira
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: an iterable of issues
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :return: the list of work logs
+    """
+    from_date = datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = convert_to_date(to_date)
+
+    work_logs_per_issue = await asyncio.gather(*(get_issue_work_logs_async(jira_client, from_date, to_date, issue,
+                                                                           authors) for issue in issues))
+    return [work_log for issue_work_logs in work_logs_per_issue for work_log in issue_work_logs]
+
+
+def get_issues_and_work_logs_async(jira_url, user_name, api_token, ssl_certificate, project, from_date, to_date,
+                                   concurrency=ASYNC_CONCURRENCY, authors=None, scheduler=None, metrics=None,
+                                   json_decoder=None):
+    """Retrieve the updated issues and their work logs from Jira by means of the asynchronous engine
+
+    All requests are sent from a single thread running an event loop.
+
+    :param jira_url: The base Jira URL
+    :param user_name The user name to use for connecting to Jira
+    :param api_token The API token to use for connecting to Jira
+    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param concurrency The maximum number of requests in flight
+    :param authors The account IDs or user names of the authors, None for all authors
+    :param scheduler The request scheduler, by default one without rate limit
+    :param metrics The metrics recording the latency and size of every request, None to record nothing
+    :param json_decoder The function decoding the bytes of a JSON response, by default the fastest one installed
+    :return: a tuple of the index of issues keyed by issue key and the list of work logs
+    """
+    async def retrieve():
+        async with AsyncJiraClient(jira_url, user_name, api_token, ssl_certificate, concurrency,
+                                   scheduler=scheduler, metrics=metrics, json_decoder=json_decoder) as jira_client:
+            issues = await get_updated_issues_async(jira_client, project, from_date, to_date, authors)
+            work_logs = await get_work_logs_async(jira_client, from_date, to_date, issues.values(), authors)
+            return issues, work_logs
+
+    return asyncio.run(retrieve())
@@ -0,0 +1,248 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+from operator import itemgetter
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from aggregation import GROUP_BY_FIELDS, parse_group_by
+from jiraclient import JiraClient
+from jiratimereport import AGGREGATED_OUTPUTS, AUTHOR_ID_FIELDS, PARQUET_REQUIREMENT, convert_to_date, \
+    get_issue_work_logs, get_updated_issues, is_work_log_of_authors, process_aggregated_work_logs, process_work_logs
+from requestscheduler import RequestScheduler
+from worklog import parse_date, WorkLog
+
+OUTPUTS = {"console", "csv", "excel", "jsonl", "parquet"}
+
+
+def load_jobs(config_file_name):
+    """Load the report jobs from a JSON configuration file
+
+    The configuration file contains a list of jobs, for example:
+
+        {"jobs": [{"project": "MYB", "from_date": "2020-01-01", "to_date": "2020-01-31",
+                   "output": "csv", "file_name": "myb-january.csv"}]}
+
+    A job requires a project and a from date. The to date, output (console by default), file name (required for all but
+    the console output), authors, group by and pivot settings are optional and have the same meaning as the
+    corresponding arguments of jiratimereport.py.
+
+    :param config_file_name: the location of the JSON configuration file
+    :return: the list of jobs, each a dict containing all settings
+    """
+    with open(config_file_name, "r") as config_file:
+        config = json.load(config_file)
+
+    jobs = []
+    for number, job_config in enumerate(config.get('jobs', []), start=1):
+        job = {
+            'project': job_config.get('project'),
+            'from_date': job_config.get('from_date'),
+            'to_date': job_config.get('to_date'),
+            'output': job_config.get('output', "console"),
+            'file_name': job_config.get('file_name'),
+            'authors': tuple(job_config['authors']) if job_config.get('authors') else None,
+            'group_by': job_config.get('group_by'),
+            'pivot': job_config.get('pivot')
+        }
+        if not job['project'] or not job['from_date']:
+            raise ValueError("Job " + str(number) + " requires a project and a from_date")
+        if job['output'] not in OUTPUTS:
+            raise ValueError("Job " + str(number) + " has an invalid output " + job['output'])
+        if job['output'] == "parquet" and pyarrow is None:
+            raise ValueError("Job " + str(number) + " has the parquet output: " + PARQUET_REQUIREMENT)
+        if job['output'] != "console" and not job['file_name']:
+            raise ValueError("Job " + str(number) + " requires a file_name for the " + job['output'] + " output")
+        if job['pivot'] and job['pivot'] not in GROUP_BY_FIELDS:
+            raise ValueError("Job " + str(number) + " has an invalid pivot " + job['pivot'])
+        if job['group_by'] is not None or job['pivot']:
+            if job['output'] not in AGGREGATED_OUTPUTS:
+                raise ValueError("Job " + str(number) + " cannot aggregate to the " + job['output'] + " output")
+            job['group_by'] = parse_group_by("author" if job['group_by'] is None else job['group_by'])
+        jobs.append(job)
+
+    return jobs
+
+
+def get_job_groups(jobs):
+    """Group the jobs which can share the retrieval of their issues and work logs
+
+    Jobs share the retrieval when they are for the same project and their date ranges overlap or adjoin, whatever their
+    authors. Jobs of disjoint date ranges are put in separate groups, so the days in between are not retrieved.
+
+    :param jobs: the list of jobs
+    :return: the list of groups, each a dict of the project, the date range covering its jobs and the list of jobs
+    """
+    groups = []
+    for project in dict.fromkeys(job['project'] for job in jobs):
+        group = None
+        for job in sorted((job for job in jobs if job['project'] == project), key=itemgetter('from_date')):
+            end_date = convert_to_date(job['to_date'])
+            if group is None or datetime.strptime(job['from_date'], "%Y-%m-%d") > group['end_date']:
+                group = {'project': project, 'from_date': job['from_date'], 'to_date': job['to_date'],
+                         'end_date': end_date, 'jobs': []}
+                groups.append(group)
+            elif end_date > group['end_date']:
+                group['to_date'] = job['to_date']
+                group['end_date'] = end_date
+            group['jobs'].append(job)
+
+    return groups
+
+
+def get_group_authors(jobs):
+    """Get the authors to retrieve the work logs of a group of jobs for
+
+    :param jobs: the list of jobs of the group
+    :return: the sorted list of the authors of all jobs, None when one of the jobs is for all authors
+    """
+    if any(job['authors'] is None for job in jobs):
+        return None
+    return sorted({author for job in jobs for author in job['authors']})
+
+
+def convert_json_to_authored_work_logs(issue_key, response_json, from_date, to_date, authors=None):
+    """Convert a page of JSON work logs of an issue into WorkLog objects paired with the IDs of their author
+
+    The IDs of the author who registered the work log are kept, so the work logs can be selected for the authors of
+    every job afterwards.
+
+    :param issue_key: the key of the issue of the work logs
+    :param response_json: the JSON page of work logs as received from Jira
+    :param from_date The date to start the time report as a datetime
+    :param to_date The date to end the time report (exclusive) as a datetime
+    :param authors: the account IDs or user names of the authors, None for all authors
+    :return: a list of tuples of a WorkLog and the tuple of the account ID, user name and key of its author
+    """
+    authored_work_logs = []
+    for work_log_json in response_json['worklogs']:
+        started_date = parse_date(work_log_json['started'][0:10])
+        if from_date <= started_date < to_date and is_work_log_of_authors(work_log_json, authors):
+            work_log = WorkLog(issue_key,
+                               started_date,
+                               int(work_log_json['timeSpentSeconds']),
+                               work_log_json['updateAuthor']['displayName'])
+            authored_work_logs.append((work_log,
+                                       tuple(work_log_json['author'].get(field) for field in AUTHOR_ID_FIELDS)))
+
+    return authored_work_logs
+
+
+def retrieve_work_logs(jira_client, group, workers):
+    """Retrieve the issues and work logs of a group of jobs
+
+    :param jira_client: The client to use for connecting to Jira
+    :param group: the group of jobs
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :return: a tuple of the index of issues keyed by issue key and the list of work logs paired with their author IDs
+    """
+    authors = get_group_authors(group['jobs'])
+    issues = get_updated_issues(jira_client, group['project'], group['from_date'], group['to_date'], authors)
+    from_date = datetime.strptime(group['from_date'], "%Y-%m-%d")
+
+    def retrieve(issue):
+        return get_issue_work_logs(jira_client, from_date, group['end_date'], issue, authors,
+                                   convert_json_to_authored_work_logs)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        authored_work_logs = [authored_work_log for issue_work_logs in executor.map(retrieve, issues.values())
+                              for authored_work_log in issue_work_logs]
+    return issues, authored_work_logs
+
+
+def select_job_work_logs(job, authored_work_logs):
+    """Select the work logs which have been started in the date range of a job and registered by its authors
+
+    :param job: the job
+    :param authored_work_logs: the list of work logs paired with their author IDs retrieved for the group of the job
+    :return: the list of work logs of the job
+    """
+    from_date = datetime.strptime(job['from_date'], "%Y-%m-%d")
+    to_date = convert_to_date(job['to_date'])
+    authors = job['authors']
+    return [work_log for work_log, author_ids in authored_work_logs
+            if from_date <= work_log.started < to_date and
+            (authors is None or any(author_id in authors for author_id in author_ids))]
+
+
+def run_batch(jira_client, jobs, parallel_jobs=4, workers=1):
+    """Run a batch of report jobs
+
+    The issues and work logs are retrieved once per group of jobs of the same project with overlapping date ranges, for
+    the date range covering all jobs of the group and the authors of all of them. The groups are retrieved in parallel.
+    The reports are generated in the order of the jobs, each from the work logs in the date range and of the authors of
+    the job.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param jobs: the list of jobs
+    :param parallel_jobs: the number of groups of jobs retrieved in parallel
+    :param workers: the number of issues per group for which the work logs are retrieved concurrently
+    """
+    with ThreadPoolExecutor(max_workers=parallel_jobs) as executor:
+        retrievals = {}
+        for group in get_job_groups(jobs):
+            retrieval = executor.submit(retrieve_work_logs, jira_client, group, workers)
+            for job in group['jobs']:
+                retrievals[id(job)] = retrieval
+
+        for job in jobs:
+            issues, authored_work_logs = retrievals[id(job)].result()
+            job_work_logs = select_job_work_logs(job, authored_work_logs)
+            if job['group_by']:
+                process_aggregated_work_logs(job['output'], issues, job_work_logs, job['group_by'], job['pivot'],
+                                             job['file_name'])
+            else:
+                process_work_logs(job['output'], issues, job_work_logs, file_name=job['file_name'])
+
+
+def main():
+    """The main entry point of the batch report
+
+    The responsibilities are:
+    - parse the arguments
+    - load the jobs from the configuration file
+    - run the jobs, sharing the retrieval of overlapping jobs
+    """
+    parser = argparse.ArgumentParser(description='Generate a batch of Jira time reports.')
+    parser.add_argument('jira_url',
+                        help='The Jira URL')
+    parser.add_argument('user_name',
+                        help='The user name to use for connecting to Jira')
+    parser.add_argument('api_token',
+                        help='The API token to use for connecting to Jira')
+    parser.add_argument('config',
+                        help='The location of the JSON configuration file listing the report jobs')
+    parser.add_argument('--ssl_certificate',
+                        help='The location of the SSL certificate, needed in case of self-signed certificates')
+    parser.add_argument('--parallel_jobs', type=int, default=4,
+                        help='The number of projects retrieved in parallel')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of issues per project for which the work logs are retrieved concurrently')
+    parser.add_argument('--rate_limit', type=float,
+                        help='The maximum number of requests per second sent to Jira')
+    parser.add_argument('--max_retries', type=int, default=5,
+                        help='The maximum number of retries of a throttled or failed request')
+    args = parser.parse_args()
+
+    if args.parallel_jobs < 1:
+        parser.error("--parallel_jobs must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        jobs = load_jobs(args.config)
+    except ValueError as error:
+        parser.error(str(error))
+
+    pool_size = args.parallel_jobs * args.workers
+    scheduler = RequestScheduler(rate_limit=args.rate_limit, max_in_flight=pool_size, max_retries=args.max_retries)
+    with JiraClient(args.jira_url, args.user_name, args.api_token, args.ssl_certificate,
+                    pool_size=pool_size, scheduler=scheduler) as jira_client:
+        run_batch(jira_client, jobs, args.parallel_jobs, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare the time and peak memory of the Excel writer with the former cell by cell writer
+
+Every writer runs in a separate process, so the peak RSS of one run does not influence the next.
+
+Usage: python benchmark/excel_benchmark.py [number_of_rows ...]
+"""
+from datetime import datetime, timedelta
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import xlsxwriter  # noqa: E402
+
+from issue import Issue, IssueIndex  # noqa: E402
+import jiratimereport  # noqa: E402
+from worklog import WorkLog  # noqa: E402
+
+WRITERS = ["legacy", "constant_memory"]
+
+
+def output_to_excel_legacy(issues, work_logs, file_name):
+    """The former Excel writer: in memory, cell by cell and with the date and time spent as strings
+    """
+    with xlsxwriter.Workbook(file_name) as workbook:
+        worksheet = workbook.add_worksheet()
+        row = 0
+
+        for work_log in work_logs:
+            work_log_issue = issues[work_log.issue_key]
+            worksheet.write(row, 0, work_log.author)
+            worksheet.write(row, 1, work_log.started.strftime('%Y-%m-%d'))
+            worksheet.write(row, 2, work_log.issue_key)
+            worksheet.write(row, 3, str(timedelta(seconds=work_log.time_spent)))
+            worksheet.write(row, 4, work_log_issue.summary)
+            worksheet.write(row, 5, work_log_issue.parent_key)
+            worksheet.write(row, 6, work_log_issue.parent_summary)
+
+            row += 1
+
+
+def generate_report(number_of_rows):
+    """Generate issues and work logs for a report
+
+    :param number_of_rows: the number of work logs
+    :return: a tuple of the index of issues and the list of work logs
+    """
+    issues = IssueIndex(Issue(index, "MYB-" + str(index), "Summary of issue MYB-" + str(index), "MYB-1",
+                              "Summary of the parent issue") for index in range(2, 5002))
+    first_day = datetime(2020, 1, 1)
+    work_logs = [WorkLog("MYB-" + str(index % 5000 + 2), first_day + timedelta(days=index % 365),
+                         900 * (index % 32 + 1), "Author " + str(index % 50)) for index in range(number_of_rows)]
+    return issues, work_logs
+
+
+def run_writer(writer, number_of_rows):
+    """Run a single writer and print the elapsed time and the peak RSS of this process
+    """
+    issues, work_logs = generate_report(number_of_rows)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "report.xlsx")
+        start = time.perf_counter()
+        if writer == "legacy":
+            output_to_excel_legacy(issues, work_logs, file_name)
+        else:
+            jiratimereport.output_to_excel(issues, work_logs, file_name)
+        elapsed = time.perf_counter() - start
+    print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_writer(sys.argv[2], int(sys.argv[3]))
+        return
+
+    for number_of_rows in [int(argument) for argument in sys.argv[1:]] or [100000, 1000000]:
+        for writer in WRITERS:
+            output = subprocess.run([sys.executable, __file__, "--run", writer, str(number_of_rows)],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            print("{:>9,} rows {:<16}{:>8.2f} s {:>10,} KiB peak RSS".format(number_of_rows, writer, float(output[0]),
+                                                                            int(output[1])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""A local stand-in for the Jira REST API serving synthetic projects, issues and work logs
+
+It serves the endpoints used by jiratimereport.py: the issue search, the work logs of an issue, the bulk work log API
+and the projects. The page size, the latency per request and the rate of failing (503) requests can be configured, and the number
+of requests and bytes sent are counted.
+"""
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+TIMEZONE = timezone(timedelta(hours=1))
+
+
+class FakeJira:
+    """A FakeJira object will hold the synthetic data and the HTTP server serving it
+    """
+    def __init__(self, projects=1, issues_per_project=100, work_logs_per_issue=20, authors=10, from_date="2020-01-01",
+                 days=90, page_size=50, latency=0.0, error_rate=0.0, seed=42):
+        """
+        :param projects: the number of projects, named P1, P2, ...
+        :param issues_per_project: the number of issues per project
+        :param work_logs_per_issue: the number of work logs per issue
+        :param authors: the number of distinct authors
+        :param from_date: the first day on which work is logged, format yyyy-mm-dd
+        :param days: the number of days over which the work logs are spread
+        :param page_size: the maximum number of issues or work logs per page
+        :param latency: the number of seconds every request is delayed
+        :param error_rate: the fraction of requests failing with 503 Service Unavailable
+        :param seed: the seed of the random generator, the same seed generates the same data
+        """
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+        first_day = datetime.strptime(from_date, "%Y-%m-%d").replace(tzinfo=TIMEZONE)
+        self.projects = []
+        self.issues = []
+        self.work_logs = []
+        self.work_logs_per_issue_key = {}
+        for project_number in range(1, projects + 1):
+            project = "P" + str(project_number)
+            self.projects.append({'id': str(project_number), 'key': project, 'name': "Project " + project})
+            parent_key = None
+            for issue_number in range(1, issues_per_project + 1):
+                key = project + "-" + str(issue_number)
+                issue = {
+                    'id': str(len(self.issues) + 10000),
+                    'key': key,
+                    'project': project,
+                    'fields': {'summary': "Summary of issue " + key}
+                }
+                if parent_key:
+                    issue['fields']['parent'] = {'key': parent_key,
+                                                 'fields': {'summary': "Summary of issue " + parent_key}}
+                if issue_number % 10 == 1:
+                    parent_key = key
+                self.issues.append(issue)
+
+                issue_work_logs = []
+                for _ in range(work_logs_per_issue):
+                    author = self.random.randrange(authors)
+                    started = first_day + timedelta(days=self.random.randrange(days),
+                                                    minutes=self.random.randrange(8 * 60, 18 * 60))
+                    work_log_id = len(self.work_logs) + 100000
+                    work_log = {
+                        'id': str(work_log_id),
+                        'issueId': issue['id'],
+                        'started': started.strftime("%Y-%m-%dT%H:%M:%S.000%z"),
+                        'timeSpentSeconds': 900 * self.random.randrange(1, 33),
+                        'author': {'accountId': "account-" + str(author),
+                                   'displayName': "Author " + str(author)},
+                        'updateAuthor': {'accountId': "account-" + str(author),
+                                         'displayName': "Author " + str(author)},
+                        'updatedMillis': int(started.timestamp() * 1000) + work_log_id
+                    }
+                    self.work_logs.append(work_log)
+                    issue_work_logs.append(work_log)
+                self.work_logs_per_issue_key[key] = issue_work_logs
+
+        self.issues_per_id = {issue['id']: issue for issue in self.issues}
+        self.work_logs_per_id = {int(work_log['id']): work_log for work_log in self.work_logs}
+        self.server = None
+
+    def start(self):
+        """Start serving on a free local port in a background thread
+
+        :return: the base URL of the server
+        """
+        fake_jira = self
+
+        class Handler(FakeJiraHandler):
+            jira = fake_jira
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return "http://127.0.0.1:" + str(self.server.server_port)
+
+    def stop(self):
+        """Stop serving
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        """Reset the number of requests, errors and bytes sent
+        """
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.bytes_sent = 0
+
+    def get_project(self, project_id_or_key):
+        """Get a project by its ID or by its key in any case
+
+        :param project_id_or_key: the ID or key of the project
+        :return: the project, None when there is no such project
+        """
+        for project in self.projects:
+            if project_id_or_key == project['id'] or project_id_or_key.upper() == project['key']:
+                return project
+        return None
+
+    def search(self, query):
+        """Search the issues by means of the subset of JQL used by jiratimereport.py
+
+        :param query: the parsed query string of the request
+        :return: the response JSON
+        """
+        jql = query['jql'][0]
+        project = re.search(r'project = "([^"]+)"', jql)
+        from_date = re.search(r'worklogDate >= "([^"]+)"', jql)
+        to_date = re.search(r'worklogDate < "([^"]+)"', jql)
+        ids = re.search(r'id in \(([^)]*)\)', jql)
+        ids = set(ids.group(1).split(',')) if ids else None
+
+        issues = []
+        for issue in self.issues:
+            if project and issue['project'] != project.group(1) or ids is not None and issue['id'] not in ids:
+                continue
+            if from_date and to_date and not any(from_date.group(1) <= work_log['started'][0:10] < to_date.group(1)
+                                                 for work_log in self.work_logs_per_issue_key[issue['key']]):
+                continue
+            issues.append({'id': issue['id'], 'key': issue['key'], 'fields': issue['fields']})
+
+        return self.page(query, issues, 'issues')
+
+    def get_work_logs(self, issue_key, query):
+        """Get a page of the work logs of an issue, optionally limited to a started range
+
+        :param issue_key: the key of the issue
+        :param query: the parsed query string of the request
+        :return: the response JSON
+        """
+        started_after = int(query['startedAfter'][0]) if 'startedAfter' in query else None
+        started_before = int(query['startedBefore'][0]) if 'startedBefore' in query else None
+        work_logs = []
+        for work_log in self.work_logs_per_issue_key.get(issue_key, []):
+            started = int(datetime.strptime(work_log['started'], "%Y-%m-%dT%H:%M:%S.%f%z").timestamp() * 1000)
+            if (started_after is None or started >= started_after) and \
+                    (started_before is None or started <= started_before):
+                work_logs.append(self.convert_work_log(work_log))
+
+        return self.page(query, work_logs, 'worklogs')
+
+    def get_updated_work_logs(self, query):
+        """Get a page of the IDs of the work logs updated since a moment
+
+        :param query: the parsed query string of the request
+        :return: the response JSON
+        """
+        since = int(query.get('since', ['0'])[0])
+        updated = sorted((work_log['updatedMillis'], int(work_log['id'])) for work_log in self.work_logs
+                         if work_log['updatedMillis'] >= since)
+        values = updated[:1000]
+        return {'values': [{'worklogId': work_log_id, 'updatedTime': updated_millis}
+                           for updated_millis, work_log_id in values],
+                'since': since,
+                'until': values[-1][0] + 1 if values else since,
+                'lastPage': len(updated) <= 1000}
+
+    def list_work_logs(self, body):
+        """Get the work logs for a list of IDs
+
+        :param body: the parsed request body
+        :return: the response JSON
+        """
+        return [self.convert_work_log(self.work_logs_per_id[work_log_id]) for work_log_id in body['ids']
+                if work_log_id in self.work_logs_per_id]
+
+    @staticmethod
+    def convert_work_log(work_log):
+        return {key: value for key, value in work_log.items() if key != 'updatedMillis'}
+
+    def page(self, query, values, name):
+        start_at = int(query.get('startAt', ['0'])[0])
+        max_results = min(int(query.get('maxResults', [str(self.page_size)])[0]), self.page_size)
+        return {'startAt': start_at, 'maxResults': max_results, 'total': len(values),
+                name: values[start_at:start_at + max_results]}
+
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    """The request handler of the fake Jira server, the jira attribute is set to the FakeJira object to serve
+    """
+    jira = None
+    protocol_version = "HTTP/1.1"
+    # The headers and body are sent separately, Nagle's algorithm would hold back the body until the headers are acked
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/rest/api/2/search":
+            self.respond(lambda: self.jira.search(query))
+        elif url.path.startswith("/rest/api/2/issue/") and url.path.rstrip("/").endswith("/worklog"):
+            issue_key = url.path[len("/rest/api/2/issue/"):].split("/")[0]
+            self.respond(lambda: self.jira.get_work_logs(issue_key, query))
+        elif url.path.startswith("/rest/api/2/project/"):
+            project = self.jira.get_project(url.path[len("/rest/api/2/project/"):])
+            self.respond((lambda: project) if project else None)
+        elif url.path == "/rest/api/2/worklog/updated":
+            self.respond(lambda: self.jira.get_updated_work_logs(query))
+        elif url.path == "/rest/api/2/worklog/deleted":
+            self.respond(lambda: {'values': [], 'since': int(query.get('since', ['0'])[0]),
+                                  'until': int(query.get('since', ['0'])[0]), 'lastPage': True})
+        else:
+            self.respond(None)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path == "/rest/api/2/worklog/list":
+            self.respond(lambda: self.jira.list_work_logs(json.loads(body)))
+        else:
+            self.respond(None)
+
+    def respond(self, create_response):
+        if self.jira.latency:
+            time.sleep(self.jira.latency)
+
+        with self.jira.lock:
+            self.jira.requests += 1
+            failed = self.jira.error_rate and self.jira.random.random() < self.jira.error_rate
+            if failed:
+                self.jira.errors += 1
+
+        if create_response is None:
+            status, body = 404, b'{"errorMessages": ["Not found"]}'
+        elif failed:
+            status, body = 503, b'{"errorMessages": ["Service unavailable"]}'
+        else:
+            status, body = 200, json.dumps(create_response()).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if failed:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+        with self.jira.lock:
+            self.jira.bytes_sent += len(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,72 @@
+"""Measure the memory used per 100k work logs by the different work log representations
+
+Usage: python benchmark/memory_benchmark.py [number_of_work_logs]
+"""
+from datetime import datetime, timedelta
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from worklog import WorkLog, WorkLogBatch  # noqa: E402
+
+
+class PlainWorkLog:
+    """The work log representation with a per-instance __dict__ and no interning, as a reference
+    """
+    def __init__(self, issue_key, started, time_spent, author):
+        self.issue_key = issue_key
+        self.started = started
+        self.time_spent = time_spent
+        self.author = author
+
+
+def generate_work_log_fields(number_of_work_logs):
+    """Generate the fields of work logs the way they are decoded from JSON, with a fresh string per work log
+
+    :param number_of_work_logs: the number of work logs to generate
+    :return: a generator of tuples of issue key, started, time spent and author
+    """
+    first_day = datetime(2020, 1, 1)
+    for index in range(number_of_work_logs):
+        yield ("MYB-" + str(index % 5000),
+               first_day + timedelta(days=index % 365),
+               900 * (index % 32 + 1),
+               "Author " + str(index % 50))
+
+
+def measure(create, number_of_work_logs):
+    """Measure the memory allocated by a representation of the work logs
+
+    :param create: the function creating the representation from an iterable of work log fields
+    :param number_of_work_logs: the number of work logs to create
+    :return: the number of bytes allocated
+    """
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    work_logs = create(generate_work_log_fields(number_of_work_logs))
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del work_logs
+    return sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+
+
+def main():
+    number_of_work_logs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    representations = [
+        ("plain objects", lambda fields: [PlainWorkLog(*work_log_fields) for work_log_fields in fields]),
+        ("slotted WorkLog", lambda fields: [WorkLog(*work_log_fields) for work_log_fields in fields]),
+        ("columnar WorkLogBatch", lambda fields: WorkLogBatch(WorkLog(*work_log_fields) for work_log_fields in fields))
+    ]
+
+    reference = None
+    for name, create in representations:
+        size = measure(create, number_of_work_logs)
+        reference = reference or size
+        print("{:<24}{:>12,} bytes per 100k work logs ({:.0%})".format(name, size * 100000 // number_of_work_logs,
+                                                                       size / reference))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Benchmark the complete report pipeline against a synthetic local Jira server
+
+For every engine and output format jiratimereport.py runs in a separate process against the fake Jira server of
+fakejira.py. The wall time, the number of requests, the number of bytes received and the peak RSS of the process are
+recorded. The results can be saved as a baseline, and a later run can be compared with the baseline to detect
+regressions: the run fails when it sends more requests, or takes more time or memory than the tolerance allows.
+
+Usage: python benchmark/pipeline_benchmark.py [--issues 500] [--latency 0.005] [--save_baseline baseline.json]
+       python benchmark/pipeline_benchmark.py --baseline baseline.json
+"""
+import argparse
+from datetime import datetime, timedelta
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fakejira import FakeJira
+
+REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "jiratimereport.py")
+ENGINES = {
+    'search': [],
+    'stream': ["--stream"],
+    'bulk': ["--engine", "bulk"],
+    'async': ["--engine", "async"],
+    'sharded': ["--shards", "issues"]
+}
+OUTPUTS = ["console", "csv", "excel", "jsonl", "parquet"]
+DATA_SETTINGS = ["projects", "issues", "work_logs", "authors", "days", "page_size", "latency", "error_rate", "seed",
+                 "workers"]
+
+
+def run_report(fake_jira, url, engine, output, from_date, to_date, workers):
+    """Run jiratimereport.py in a separate process for the first project of the fake Jira server
+
+    :param fake_jira: the fake Jira server
+    :param url: the URL of the fake Jira server
+    :param engine: the name of the engine, one of ENGINES
+    :param output: the output format
+    :param from_date: the date to start the time report, format yyyy-mm-dd
+    :param to_date: the date to end the time report, format yyyy-mm-dd
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :return: a dict with the measurements
+    """
+    arguments = [sys.executable, REPORT, url, "user_name", "api_token", "P1", from_date, "--to_date", to_date,
+                 "--output", output, "--workers", str(workers)] + ENGINES[engine]
+    fake_jira.reset_counters()
+    with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(arguments, cwd=directory, stdout=subprocess.DEVNULL, stderr=errors)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode:
+            errors.seek(0)
+            raise RuntimeError("The " + engine + " engine with the " + output + " output failed:\n" +
+                               errors.read().decode("utf-8", "replace"))
+
+    return {
+        'name': engine + "-" + output,
+        'wall_time': round(wall_time, 3),
+        'requests': fake_jira.requests,
+        'errors': fake_jira.errors,
+        'bytes': fake_jira.bytes_sent,
+        'peak_rss_kib': usage.ru_maxrss
+    }
+
+
+def compare_with_baseline(results, baseline, time_tolerance, memory_tolerance):
+    """Compare the results with the results of a baseline
+
+    The number of successful requests must not increase, the wall time and peak RSS must not increase by more than the
+    tolerance.
+
+    :param results: the list of measurements of this run
+    :param baseline: the baseline as saved by a former run
+    :param time_tolerance: the allowed relative increase of the wall time, e.g. 0.2 for 20%
+    :param memory_tolerance: the allowed relative increase of the peak RSS
+    :return: the list of regression messages, empty when there are none
+    """
+    baseline_results = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = baseline_results.get(result['name'])
+        if base is None:
+            continue
+        if result['requests'] - result['errors'] > base['requests'] - base['errors']:
+            regressions.append("{name}: {0} requests, baseline {1}".format(
+                result['requests'] - result['errors'], base['requests'] - base['errors'], **result))
+        if result['wall_time'] > base['wall_time'] * (1 + time_tolerance):
+            regressions.append("{name}: {wall_time:.2f} s, baseline {0:.2f} s".format(base['wall_time'], **result))
+        if result['peak_rss_kib'] > base['peak_rss_kib'] * (1 + memory_tolerance):
+            regressions.append("{name}: {peak_rss_kib:,} KiB peak RSS, baseline {0:,} KiB".format(
+                base['peak_rss_kib'], **result))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark jiratimereport.py against a synthetic local Jira server.')
+    parser.add_argument('--projects', type=int, default=3,
+                        help='The number of projects, the report is generated for the first one')
+    parser.add_argument('--issues', type=int, default=500,
+                        help='The number of issues per project')
+    parser.add_argument('--work_logs', type=int, default=20,
+                        help='The number of work logs per issue')
+    parser.add_argument('--authors', type=int, default=25,
+                        help='The number of distinct authors')
+    parser.add_argument('--days', type=int, default=90,
+                        help='The number of days over which the work logs are spread')
+    parser.add_argument('--page_size', type=int, default=50,
+                        help='The maximum number of issues or work logs per page')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='The number of seconds every request is delayed')
+    parser.add_argument('--error_rate', type=float, default=0.0,
+                        help='The fraction of requests failing with 503 Service Unavailable')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='The seed of the synthetic data')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='The value of the --workers argument of the report')
+    parser.add_argument('--engines', default="search,stream,bulk,async",
+                        help='The comma separated engines to benchmark, choose from ' + ", ".join(ENGINES))
+    parser.add_argument('--outputs', default=",".join(OUTPUTS),
+                        help='The comma separated output formats to benchmark')
+    parser.add_argument('--save_baseline',
+                        help='The location to save the results as baseline')
+    parser.add_argument('--baseline',
+                        help='The location of the baseline to compare the results with')
+    parser.add_argument('--time_tolerance', type=float, default=0.25,
+                        help='The allowed relative increase of the wall time compared with the baseline')
+    parser.add_argument('--memory_tolerance', type=float, default=0.1,
+                        help='The allowed relative increase of the peak RSS compared with the baseline')
+    args = parser.parse_args()
+
+    settings = {setting: getattr(args, setting) for setting in DATA_SETTINGS}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['settings'] != settings:
+            parser.error("The settings differ from the settings of the baseline " + json.dumps(baseline['settings']))
+
+    from_date = "2020-01-01"
+    to_date = (datetime.strptime(from_date, "%Y-%m-%d") + timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    fake_jira = FakeJira(args.projects, args.issues, args.work_logs, args.authors, from_date, args.days,
+                         args.page_size, args.latency, args.error_rate, args.seed)
+    url = fake_jira.start()
+
+    results = []
+    try:
+        for engine in args.engines.split(","):
+            for output in args.outputs.split(","):
+                result = run_report(fake_jira, url, engine, output, from_date, to_date, args.workers)
+                results.append(result)
+                print("{name:<18}{wall_time:>8.2f} s {requests:>7,} requests {errors:>5,} errors "
+                      "{bytes:>13,} bytes {peak_rss_kib:>10,} KiB peak RSS".format(**result))
+    finally:
+        fake_jira.stop()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({'settings': settings, 'results': results}, baseline_file, indent=2)
+
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print("Regression " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import threading
+
+from issue import Issue, IssueIndex
+from jiratimereport import convert_json_to_issues, convert_to_date, get_issue_work_logs, get_search_params, \
+    get_updated_issues_jql
+from worklog import parse_date, WorkLog
+
+
+class CrawlJournal:
+    """A CrawlJournal object will record the progress of a crawl in an append-only file, so it can be resumed
+
+    Every record is a line of JSON: the settings of the crawl, a page of issues found by the search with the startAt of
+    the next page, or the work logs of an issue which have been retrieved completely. Every record is flushed to disk
+    once written. A last record which has only been written partially, because the crawl was interrupted, is ignored.
+    """
+    def __init__(self, file_name, settings, resume=False):
+        """
+        :param file_name: The location of the journal
+        :param settings: a dict with the settings of the crawl, a journal can only be resumed with the same settings
+        :param resume: True to continue the crawl recorded in an existing journal, False to start a new journal
+        """
+        self.lock = threading.Lock()
+        self.issues = IssueIndex()
+        self.next_start_at = 0
+        self.search_complete = False
+        self.work_logs_per_issue = {}
+
+        if resume and os.path.exists(file_name):
+            self.file = open(file_name, "r+b")
+            try:
+                self.load(settings)
+            except ValueError:
+                self.file.close()
+                raise
+        else:
+            self.file = open(file_name, "wb")
+            self.write({'settings': settings})
+
+    def load(self, settings):
+        """Load the records of the journal and position the file after the last complete record
+
+        :param settings: the settings of the crawl, which must be equal to the settings recorded in the journal
+        """
+        end_of_records = 0
+        for line in self.file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if end_of_records == 0 and record.get('settings') != settings:
+                raise ValueError("The journal " + self.file.name + " records a crawl with other settings: " +
+                                 json.dumps(record.get('settings')))
+            self.apply(record)
+            end_of_records += len(line)
+
+        self.file.seek(end_of_records)
+        self.file.truncate()
+        if end_of_records == 0:
+            self.write({'settings': settings})
+
+    def apply(self, record):
+        """Apply a record to the state of the crawl
+
+        :param record: the record as read from the journal
+        """
+        if 'issues' in record:
+            for issue in record['issues']:
+                self.issues.add(Issue(*issue))
+            self.next_start_at = record['next_start_at']
+            self.search_complete = record['search_complete']
+        elif 'issue_key' in record:
+            self.work_logs_per_issue[record['issue_key']] = [
+                WorkLog(record['issue_key'], parse_date(started), time_spent, author)
+                for started, time_spent, author in record['work_logs']]
+
+    def record_search_page(self, issues, next_start_at, search_complete):
+        """Record a page of issues found by the search
+
+        :param issues: the list of issues of the page
+        :param next_start_at: the startAt of the next page
+        :param search_complete: True when this was the last page
+        """
+        record = {
+            'issues': [[issue.issue_id, issue.key, issue.summary, issue.parent_key, issue.parent_summary]
+                       for issue in issues],
+            'next_start_at': next_start_at,
+            'search_complete': search_complete
+        }
+        with self.lock:
+            self.write(record)
+            self.apply(record)
+
+    def record_work_logs(self, issue_key, work_logs):
+        """Record the complete list of work logs of an issue
+
+        :param issue_key: the key of the issue
+        :param work_logs: the list of work logs of the issue
+        """
+        with self.lock:
+            self.write({
+                'issue_key': issue_key,
+                'work_logs': [[work_log.started.strftime('%Y-%m-%d'), work_log.time_spent, work_log.author]
+                              for work_log in work_logs]
+            })
+            self.work_logs_per_issue[issue_key] = work_logs
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')).encode("utf-8") + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Close the journal
+        """
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def get_updated_issues_resumable(jira_client, journal, project, from_date, to_date, authors=None):
+    """Retrieve the updated issues from Jira, continuing at the page after the last one recorded in the journal
+
+    :param jira_client: The client to use for connecting to Jira
+    :param journal: the journal of the crawl
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors The account IDs or user names of the authors to retrieve the issues for, None for all authors
+    :return: an index of the issues keyed by issue key
+    """
+    jql = get_updated_issues_jql(project, from_date, to_date, authors)
+    start_at = journal.next_start_at
+    while not journal.search_complete:
+        response_json = jira_client.get_json("/rest/api/2/search", get_search_params(jql, start_at))
+        start_at += int(response_json['maxResults'])
+        journal.record_search_page(convert_json_to_issues(response_json), start_at,
+                                   start_at >= int(response_json['total']))
+
+    return journal.issues
+
+
+def get_work_logs_resumable(jira_client, journal, from_date, to_date, issues, workers=1, authors=None):
+    """Retrieve the work logs from Jira for the issues of which the work logs have not been recorded in the journal yet
+
+    The work logs of an issue are recorded as soon as all its pages have been retrieved. When the retrieval fails, the
+    issues which have been completed by then are not retrieved again by a resumed crawl.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param journal: the journal of the crawl
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: the list of issues
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :return: the list of work logs in the order of the issues
+    """
+    from_date = datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = convert_to_date(to_date)
+
+    def retrieve(issue):
+        journal.record_work_logs(issue.key, get_issue_work_logs(jira_client, from_date, to_date, issue, authors))
+
+    remaining_issues = [issue for issue in issues if issue.key not in journal.work_logs_per_issue]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(retrieve, issue) for issue in remaining_issues]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Do not start the retrieval of the remaining issues, the crawl is to be resumed later
+                executor.shutdown(cancel_futures=True)
+                raise
+    else:
+        for issue in remaining_issues:
+            retrieve(issue)
+
+    return [work_log for issue in issues for work_log in journal.work_logs_per_issue[issue.key]]
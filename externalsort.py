@@ -0,0 +1,60 @@
+import heapq
+from itertools import islice
+import pickle
+import tempfile
+
+
+def external_sort(items, key, buffer_size):
+    """Sort items by means of an external merge sort
+
+    The items are read in runs of at most buffer_size items. When all items fit in a single run, the run is sorted in
+    memory. Otherwise every run is sorted and spilled to a temporary file, after which the runs are merged. The sort is
+    stable, just like sorted().
+
+    :param items: the iterable of items to sort, the items must be picklable
+    :param key: the function returning the sort key of an item
+    :param buffer_size: the maximum number of items kept in memory per run
+    :return: a generator of the sorted items
+    """
+    items = iter(items)
+    run = sorted(islice(items, buffer_size), key=key)
+    if len(run) < buffer_size:
+        yield from run
+        return
+
+    run_files = []
+    try:
+        while run:
+            run_files.append(spill_run(run))
+            run = sorted(islice(items, buffer_size), key=key)
+
+        yield from heapq.merge(*(read_run(run_file) for run_file in run_files), key=key)
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def spill_run(run):
+    """Write a sorted run to a temporary file
+
+    :param run: the list of sorted items
+    :return: the temporary file, positioned at the start
+    """
+    run_file = tempfile.TemporaryFile()
+    for item in run:
+        pickle.dump(item, run_file, pickle.HIGHEST_PROTOCOL)
+    run_file.seek(0)
+    return run_file
+
+
+def read_run(run_file):
+    """Read the items of a sorted run from a temporary file
+
+    :param run_file: the temporary file written by spill_run
+    :return: a generator of the items
+    """
+    while True:
+        try:
+            yield pickle.load(run_file)
+        except EOFError:
+            return
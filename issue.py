@@ -1,9 +1,14 @@
+import sys
+
+
 class Issue:
     """A Issue object will represent a Jira Issue containing limited fields
     """
+    __slots__ = ('issue_id', 'key', 'summary', 'parent_key', 'parent_summary')
+
     def __init__(self, issue_id, key, summary, parent_key, parent_summary):
         self.issue_id = issue_id
-        self.key = key
+        self.key = sys.intern(key)
         self.summary = summary
         self.parent_key = parent_key
         self.parent_summary = parent_summary
@@ -14,3 +19,35 @@ class Issue:
                    (other.issue_id, other.key, other.summary, other.parent_key, other.parent_summary)
         except AttributeError:
             return NotImplemented
+
+
+class IssueIndex(dict):
+    """An IssueIndex object will hold Issues keyed by their issue key
+
+    Looking up an issue key which is not in the index raises a KeyError naming the missing issue.
+    """
+    def __init__(self, issues=()):
+        """
+        :param issues: the issues to add to the index
+        """
+        super().__init__((issue.key, issue) for issue in issues)
+
+    def add(self, issue):
+        """Add an issue to the index
+
+        :param issue: the issue to add
+        """
+        self[issue.key] = issue
+
+    def indexing(self, issues):
+        """Add issues to the index while iterating over them
+
+        :param issues: the iterable of issues to add
+        :return: a generator yielding the issues after they have been added
+        """
+        for issue in issues:
+            self.add(issue)
+            yield issue
+
+    def __missing__(self, key):
+        raise KeyError("Issue " + str(key) + " referenced by a work log has not been retrieved")
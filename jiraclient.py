@@ -0,0 +1,105 @@
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+from jsondecoder import get_json_decoder
+from requestscheduler import RequestScheduler
+
+DEFAULT_POOL_SIZE = 10
+
+
+class JiraClient:
+    """A JiraClient object will hold the connection settings of a Jira server and a pooled HTTP session
+
+    The session keeps the connections alive, so consecutive requests do not need to set up a new TCP and TLS connection.
+    All requests are paced and retried by a request scheduler, a response with an error status which cannot be retried
+    raises a requests.HTTPError.
+    """
+    def __init__(self, jira_url, user_name, api_token, ssl_certificate, pool_size=DEFAULT_POOL_SIZE, scheduler=None,
+                 metrics=None, json_decoder=None):
+        """
+        :param jira_url: The base Jira URL
+        :param user_name The user name to use for connecting to Jira
+        :param api_token The API token to use for connecting to Jira
+        :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+        :param pool_size The maximum number of connections kept alive to the Jira server
+        :param scheduler The request scheduler, by default one without rate limit allowing pool_size requests in flight
+        :param metrics The metrics recording the latency and size of every request, None to record nothing
+        :param json_decoder The function decoding the bytes of a JSON response, by default the fastest one installed
+        """
+        self.jira_url = jira_url
+        self.metrics = metrics
+        self.decode_json = json_decoder or get_json_decoder()
+        self.scheduler = scheduler or RequestScheduler(max_in_flight=pool_size)
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(user_name, api_token)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+        if ssl_certificate:
+            self.session.verify = ssl_certificate
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_request(self, url, params):
+        """Perform the GET request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the complete response as returned from the Jira API
+        """
+        return self.send(url, lambda: self.session.get(self.jira_url + url, params=params))
+
+    def get_json(self, url, params):
+        """Perform the GET request to the Jira server and decode the JSON response
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the decoded JSON response
+        """
+        return self.decode_json(self.get_request(url, params).content)
+
+    def post_request(self, url, body):
+        """Perform the POST request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param body: the JSON body to be sent
+        :return: the complete response as returned from the Jira API
+        """
+        return self.send(url, lambda: self.session.post(self.jira_url + url, json=body))
+
+    def post_json(self, url, body):
+        """Perform the POST request to the Jira server and decode the JSON response
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param body: the JSON body to be sent
+        :return: the decoded JSON response
+        """
+        return self.decode_json(self.post_request(url, body).content)
+
+    def send(self, url, request):
+        """Send a request by means of the scheduler and verify the status of the response
+
+        :param url: the Jira URL relative to the base Jira URL of the request
+        :param request: the function sending the request and returning the response
+        :return: the complete response as returned from the Jira API
+        """
+        if self.metrics:
+            request = self.metrics.measure_request(url, request)
+        response = self.scheduler.execute(request)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        """Close the connections of the session
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,59 +1,53 @@
 import argparse
+import cProfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from itertools import islice
 import json
 from operator import attrgetter
+import sys
+from urllib.parse import quote
 
 import requests
 import xlsxwriter as xlsxwriter
-from requests.auth import HTTPBasicAuth
-
-from issue import Issue
-from worklog import WorkLog
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from aggregation import aggregate_work_logs, aggregation_to_table, format_table_row, GROUP_BY_FIELDS, \
+    parse_group_by, pivot_to_table, pivot_work_logs
+from externalsort import external_sort
+from issue import Issue, IssueIndex
+from jiraclient import JiraClient
+from jsondecoder import get_json_decoder, JSON_DECODERS
+from metrics import measure_phase, Metrics
+from requestscheduler import RequestScheduler
+from worklog import parse_date, WorkLog, WorkLogBatch
+from worklogcache import WorkLogCache
 
 CSV_FILE_NAME = "jira-time-report.csv"
 EXCEL_FILE_NAME = "jira-time-report.xlsx"
-
-
-def get_request(jira_url, user_name, api_token, ssl_certificate, url, params):
-    """Perform the GET request to the Jira server
-
-    :param jira_url: The base Jira URL
-    :param user_name The user name to use for connecting to Jira
-    :param api_token The API token to use for connecting to Jira
-    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
-    :param url: the complete Jira URL for invoking the request
-    :param params: the parameters to be added to the Jira URL
-    :return: the complete response as returned from the Jira API
-    """
-    auth = HTTPBasicAuth(user_name, api_token)
-
-    headers = {
-        "Accept": "application/json"
-    }
-
-    if ssl_certificate:
-
-        response = requests.request(
-            "GET",
-            jira_url + url,
-            headers=headers,
-            params=params,
-            auth=auth,
-            verify=ssl_certificate
-        )
-
-    else:
-
-        response = requests.request(
-            "GET",
-            jira_url + url,
-            headers=headers,
-            params=params,
-            auth=auth
-        )
-
-    return response
+JSONL_FILE_NAME = "jira-time-report.jsonl"
+PARQUET_FILE_NAME = "jira-time-report.parquet"
+WORK_LOG_LIST_BATCH_SIZE = 1000
+ISSUE_ID_SEARCH_BATCH_SIZE = 100
+SORT_BUFFER_SIZE = 100000
+SEARCH_MAX_RESULTS = 1000
+EXCEL_MAX_ROWS = 1048576
+SECONDS_PER_DAY = 86400
+PARQUET_BATCH_SIZE = 65536
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+WORK_LOG_MAX_RESULTS = 5000
+AGGREGATED_OUTPUTS = {"console", "csv", "excel"}
+ASYNC_CONCURRENCY = 16
+AUTHOR_ID_FIELDS = ('accountId', 'name', 'key')
+PARQUET_REQUIREMENT = "The parquet output requires the pyarrow package, install it by means of pip install pyarrow"
+# The report order of the work logs, the time spent breaks the ties so that every engine yields the same report
+WORK_LOG_ORDER = attrgetter('author', 'started', 'issue_key', 'time_spent')
 
 
 def convert_to_date(to_date):
@@ -72,36 +66,77 @@ def convert_to_date(to_date):
     return converted_to_date
 
 
-def get_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate):
+def get_updated_issues(jira_client, project, from_date, to_date, authors=None):
     """Retrieve the updated issues from Jira
 
     Only the updated issues containing time spent and between the given from and to date are retrieved.
 
-    :param jira_url: The base Jira URL
-    :param user_name The user name to use for connecting to Jira
-    :param api_token The API token to use for connecting to Jira
+    :param jira_client: The client to use for connecting to Jira
     :param project The Jira project to retrieve the time report
     :param from_date The date to start the time report, format yyyy-mm-dd
     :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
-    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+    :param authors The account IDs or user names of the authors to retrieve the issues for, None for all authors
+    :return: an index of the issues keyed by issue key
+    """
+    return IssueIndex(iter_updated_issues(jira_client, project, from_date, to_date, authors))
+
+
+def iter_updated_issues(jira_client, project, from_date, to_date, authors=None):
+    """Retrieve the updated issues from Jira page by page
+
+    The issues of a page are yielded as soon as the page has been received.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors The account IDs or user names of the authors to retrieve the issues for, None for all authors
+    :return: a generator of issues
+    """
+    return iter_search_issues(jira_client, get_updated_issues_jql(project, from_date, to_date, authors))
+
+
+def get_updated_issues_jql(project, from_date, to_date, authors=None):
+    """Get the JQL query searching the updated issues containing time spent between the given from and to date
+
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors The account IDs or user names of the authors to retrieve the issues for, None for all authors
+    :return: the JQL query
+    """
+    jql = 'project = "' + project + '" and timeSpent is not null and worklogDate >= "' + from_date + '"' + \
+          ' and worklogDate < "' + convert_to_date(to_date).strftime("%Y-%m-%d") + '"'
+    if authors:
+        jql += ' and worklogAuthor in (' + ','.join('"' + author + '"' for author in authors) + ')'
+
+    return jql
+
+
+def search_issues(jira_client, jql):
+    """Retrieve all issues matching a JQL query from Jira
+
+    :param jira_client: The client to use for connecting to Jira
+    :param jql: The JQL query to search for
     :return: a list of issues
     """
+    return list(iter_search_issues(jira_client, jql))
+
+
+def iter_search_issues(jira_client, jql):
+    """Retrieve all issues matching a JQL query from Jira page by page
+
+    :param jira_client: The client to use for connecting to Jira
+    :param jql: The JQL query to search for
+    :return: a generator of issues
+    """
 
-    issues = []
     start_at = 0
 
     while True:
 
-        query = {
-            'jql': 'project = "' + project + '" and timeSpent is not null and worklogDate >= "' + from_date +
-                   '"' + ' and worklogDate < "' + convert_to_date(to_date).strftime("%Y-%m-%d") + '"',
-            'fields': 'id,key,summary,parent',
-            'startAt': str(start_at)
-        }
-
-        response = get_request(jira_url, user_name, api_token, ssl_certificate, "/rest/api/2/search", query)
-        response_json = json.loads(response.text)
-        issues.extend(convert_json_to_issues(response_json))
+        response_json = jira_client.get_json("/rest/api/2/search", get_search_params(jql, start_at))
+        yield from convert_json_to_issues(response_json)
 
         # Verify whether it is necessary to invoke the API request again because of pagination
         total_number_of_issues = int(response_json['total'])
@@ -112,7 +147,20 @@ def get_updated_issues(jira_url, user_name, api_token, project, from_date, to_da
         else:
             break
 
-    return issues
+
+def get_search_params(jql, start_at):
+    """Get the parameters of a search request for a page of issues
+
+    :param jql: The JQL query to search for
+    :param start_at: the index of the first issue of the page
+    :return: the parameters
+    """
+    return {
+        'jql': jql,
+        'fields': 'id,key,summary,parent',
+        'maxResults': str(SEARCH_MAX_RESULTS),
+        'startAt': str(start_at)
+    }
 
 
 def convert_json_to_issues(response_json):
@@ -132,69 +180,320 @@ def convert_json_to_issues(response_json):
     return issues
 
 
-def get_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues):
+def get_work_logs(jira_client, from_date, to_date, issues, workers=1, authors=None):
     """Retrieve the work logs from Jira
 
     All work logs from the list of issues are retrieved. Only the work logs which have been started between the from and
     to date are used, the other work logs are not taken into account.
 
-    :param jira_url: The base Jira URL
-    :param user_name The user name to use for connecting to Jira
-    :param api_token The API token to use for connecting to Jira
+    When more than one worker is given, the work logs of the issues are retrieved concurrently. The returned list keeps
+    the order of the issues, so the result is identical to the one of a single worker.
+
+    :param jira_client: The client to use for connecting to Jira
     :param from_date The date to start the time report, format yyyy-mm-dd
     :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
-    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
-    :param issues: a list of issues
+    :param issues: an iterable of issues, e.g. the values of an issue index
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
     :return: the list of work logs which has been requested
     """
-    work_logs = []
+    return list(iter_work_logs(jira_client, from_date, to_date, issues, workers, authors))
+
+
+def iter_work_logs(jira_client, from_date, to_date, issues, workers=1, authors=None):
+    """Retrieve the work logs from Jira issue by issue
+
+    The issues are consumed lazily, so they can be streamed from the search pages. The work logs of an issue are yielded
+    as soon as they have been received, in the order of the issues. When more than one worker is given, at most twice
+    the number of workers issues are retrieved ahead.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: an iterable of issues
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :return: a generator of work logs
+    """
     from_date = datetime.strptime(from_date, "%Y-%m-%d")
     to_date = convert_to_date(to_date)
 
-    for issue in issues:
-        start_at = 0
-        while True:
-            params = {
-                'startAt': str(start_at)
-            }
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for issue in issues:
+                pending.append(executor.submit(get_issue_work_logs, jira_client, from_date, to_date, issue, authors))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    else:
+        for issue in issues:
+            yield from get_issue_work_logs(jira_client, from_date, to_date, issue, authors)
 
-            url = "/rest/api/2/issue/" + issue.key + "/worklog/"
-            response = get_request(jira_url, user_name, api_token, ssl_certificate, url, params)
-            response_json = json.loads(response.text)
-            work_logs_json = response_json['worklogs']
-
-            for work_log_json in work_logs_json:
-                started = work_log_json['started']
-                started_date = datetime.strptime(started[0:10], "%Y-%m-%d")
-                if from_date <= started_date < to_date:
-                    author_json = work_log_json['updateAuthor']
-                    work_logs.append(WorkLog(issue.key,
-                                             started_date,
-                                             int(work_log_json['timeSpentSeconds']),
-                                             author_json['displayName']))
-
-            # Verify whether it is necessary to invoke the API request again because of pagination
-            total_number_of_issues = int(response_json['total'])
-            max_results = int(response_json['maxResults'])
-            max_number_of_issues_processed = start_at + max_results
-            if max_number_of_issues_processed < total_number_of_issues:
-                start_at = max_number_of_issues_processed
-            else:
-                break
+
+def get_issue_work_logs(jira_client, from_date, to_date, issue, authors=None, convert=None):
+    """Retrieve the work logs of a single issue from Jira
+
+    All pages of work logs of the issue are retrieved. Only the work logs which have been started between the from and
+    to date are used. The date range is passed to Jira as well, widened by a day on both sides as Jira interprets it in
+    UTC, so old work logs of the issue are not transferred at all.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param from_date The date to start the time report as a datetime
+    :param to_date The date to end the time report (exclusive) as a datetime
+    :param issue: the issue to retrieve the work logs for
+    :param authors: the account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :param convert: the function converting a page of JSON work logs, by default convert_json_to_work_logs
+    :return: the list of work logs of the issue
+    """
+    convert = convert or convert_json_to_work_logs
+    work_logs = []
+    start_at = 0
+    while True:
+        url = "/rest/api/2/issue/" + issue.key + "/worklog/"
+        response_json = jira_client.get_json(url, get_work_log_params(from_date, to_date, start_at))
+        work_logs.extend(convert(issue.key, response_json, from_date, to_date, authors))
+
+        # Verify whether it is necessary to invoke the API request again because of pagination
+        total_number_of_issues = int(response_json['total'])
+        max_results = int(response_json['maxResults'])
+        max_number_of_issues_processed = start_at + max_results
+        if max_number_of_issues_processed < total_number_of_issues:
+            start_at = max_number_of_issues_processed
+        else:
+            break
 
     return work_logs
 
 
+def get_work_log_params(from_date, to_date, start_at):
+    """Get the parameters of a request for a page of work logs of an issue
+
+    :param from_date The date to start the time report as a datetime
+    :param to_date The date to end the time report (exclusive) as a datetime
+    :param start_at: the index of the first work log of the page
+    :return: the parameters
+    """
+    return {
+        'startedAfter': str(int((from_date - timedelta(days=1)).timestamp() * 1000)),
+        'startedBefore': str(int((to_date + timedelta(days=1)).timestamp() * 1000)),
+        'maxResults': str(WORK_LOG_MAX_RESULTS),
+        'startAt': str(start_at)
+    }
+
+
+def convert_json_to_work_logs(issue_key, response_json, from_date, to_date, authors=None):
+    """Convert a page of JSON work logs of an issue into WorkLog objects
+
+    Only the work logs which have been started between the from and to date and registered by one of the authors are
+    converted.
+
+    :param issue_key: the key of the issue of the work logs
+    :param response_json: the JSON page of work logs as received from Jira
+    :param from_date The date to start the time report as a datetime
+    :param to_date The date to end the time report (exclusive) as a datetime
+    :param authors: the account IDs or user names of the authors, None for all authors
+    :return: a list of WorkLogs
+    """
+    work_logs = []
+    for work_log_json in response_json['worklogs']:
+        started_date = parse_date(work_log_json['started'][0:10])
+        if from_date <= started_date < to_date and is_work_log_of_authors(work_log_json, authors):
+            author_json = work_log_json['updateAuthor']
+            work_logs.append(WorkLog(issue_key,
+                                     started_date,
+                                     int(work_log_json['timeSpentSeconds']),
+                                     author_json['displayName']))
+
+    return work_logs
+
+
+def is_work_log_of_authors(work_log_json, authors):
+    """Verify whether a work log has been registered by one of the authors
+
+    The author who registered the work log is verified, like the worklogAuthor of the search does, not the author who
+    updated it last.
+
+    :param work_log_json: the work log as JSON as received from Jira
+    :param authors: the account IDs or user names of the authors, None for all authors
+    :return: True when the work log has been registered by one of the authors
+    """
+    if not authors:
+        return True
+    author_json = work_log_json['author']
+    return any(author_json.get(field) in authors for field in AUTHOR_ID_FIELDS)
+
+
+def get_changed_work_log_ids(jira_client, change, since):
+    """Retrieve the IDs of the work logs which have been changed since the given moment
+
+    :param jira_client: The client to use for connecting to Jira
+    :param change: the kind of change, "updated" for created or updated work logs, "deleted" for deleted work logs
+    :param since: the moment in milliseconds since the epoch since when the work logs have been changed
+    :return: a tuple of the list of work log IDs and the moment in milliseconds until which the changes are returned
+    """
+    work_log_ids = []
+    until = since
+    params = {
+        'since': str(since)
+    }
+
+    while True:
+        response_json = jira_client.get_json("/rest/api/2/worklog/" + change, params)
+        work_log_ids.extend(value['worklogId'] for value in response_json['values'])
+        until = response_json.get('until', until)
+
+        # Verify whether it is necessary to invoke the API request again because of pagination
+        if response_json.get('lastPage', True):
+            break
+        params = {
+            'since': str(until)
+        }
+
+    return work_log_ids, until
+
+
+def get_work_logs_json_by_ids(jira_client, work_log_ids):
+    """Retrieve the complete work logs for a list of work log IDs
+
+    The work logs are requested in batches of WORK_LOG_LIST_BATCH_SIZE, the maximum the Jira API allows.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param work_log_ids: the list of work log IDs
+    :return: the list of work logs as JSON
+    """
+    work_logs_json = []
+    for start in range(0, len(work_log_ids), WORK_LOG_LIST_BATCH_SIZE):
+        body = {
+            'ids': work_log_ids[start:start + WORK_LOG_LIST_BATCH_SIZE]
+        }
+        work_logs_json.extend(jira_client.post_json("/rest/api/2/worklog/list", body))
+
+    return work_logs_json
+
+
+def get_issues_by_ids(jira_client, project, issue_ids):
+    """Retrieve the issues of a project for a list of issue IDs
+
+    Issue IDs which do not belong to the project are not returned. When no project is given, the issues of all projects
+    are returned.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param project The Jira project the issues must belong to, or None
+    :param issue_ids: the list of issue IDs
+    :return: a list of issues
+    """
+    issues = []
+    for start in range(0, len(issue_ids), ISSUE_ID_SEARCH_BATCH_SIZE):
+        batch = issue_ids[start:start + ISSUE_ID_SEARCH_BATCH_SIZE]
+        jql = 'id in (' + ','.join(str(issue_id) for issue_id in batch) + ')'
+        if project:
+            jql = 'project = "' + project + '" and ' + jql
+        issues.extend(search_issues(jira_client, jql))
+
+    return issues
+
+
+def get_work_logs_bulk(jira_client, project, from_date, to_date, authors=None):
+    """Retrieve the issues and work logs from Jira by means of the bulk work log API
+
+    Instead of retrieving the work logs per issue, the IDs of the work logs updated since the from date are retrieved
+    and the work logs themselves are loaded in batches. Only the issues referenced by work logs started between the from
+    and to date are retrieved. Work logs which have been created before the from date while being started after it
+    (logging work in advance) are not found this way.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors The account IDs or user names of the authors to retrieve the work logs for, None for all authors
+    :return: a tuple of the index of issues keyed by issue key and the list of work logs
+    """
+    from_date = datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = convert_to_date(to_date)
+
+    work_log_ids, _ = get_changed_work_log_ids(jira_client, "updated", int(from_date.timestamp() * 1000))
+    work_logs_json = []
+    for work_log_json in get_work_logs_json_by_ids(jira_client, work_log_ids):
+        started_date = parse_date(work_log_json['started'][0:10])
+        if from_date <= started_date < to_date and is_work_log_of_authors(work_log_json, authors):
+            work_logs_json.append((started_date, work_log_json))
+
+    issue_ids = list(dict.fromkeys(int(work_log_json['issueId']) for _, work_log_json in work_logs_json))
+    issues = IssueIndex(get_issues_by_ids(jira_client, project, issue_ids))
+    issue_keys = {issue.issue_id: issue.key for issue in issues.values()}
+
+    work_logs = []
+    for started_date, work_log_json in work_logs_json:
+        issue_id = int(work_log_json['issueId'])
+        if issue_id in issue_keys:
+            work_logs.append(WorkLog(issue_keys[issue_id],
+                                     started_date,
+                                     int(work_log_json['timeSpentSeconds']),
+                                     work_log_json['updateAuthor']['displayName']))
+
+    return issues, work_logs
+
+
+def get_project_key(jira_client, project):
+    """Resolve a Jira project to its key
+
+    The work log cache holds the project of an issue by its key, while JQL accepts the key, ID or name of a project. A
+    project given by its key in any case or by its ID is resolved to its key, a project name is not accepted.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param project The key or ID of the Jira project
+    :return: the key of the project
+    """
+    try:
+        return jira_client.get_json("/rest/api/2/project/" + quote(project, safe=""), {})['key']
+    except requests.HTTPError as error:
+        if error.response is not None and error.response.status_code == 404:
+            raise ValueError("The project " + project + " is not found, the cache requires the key of the project")
+        raise
+
+
+def sync_work_log_cache(jira_client, cache, from_date):
+    """Synchronize the local work log cache with Jira
+
+    Only the work logs which have been changed or deleted since the previous synchronization are retrieved. The first
+    synchronization, or a synchronization for a from date before the one the cache has been filled from, retrieves all
+    work logs updated since the from date. The issues of changed work logs are retrieved again, so changed summaries are
+    picked up as well.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param cache: the work log cache to synchronize
+    :param from_date The date from which the cache must contain the work logs, format yyyy-mm-dd
+    """
+    from_millis = int(datetime.strptime(from_date, "%Y-%m-%d").timestamp() * 1000)
+    synced_from, since = cache.get_watermark()
+    if synced_from is None or from_millis < synced_from:
+        synced_from, since = from_millis, from_millis
+
+    updated_work_log_ids, until = get_changed_work_log_ids(jira_client, "updated", since)
+    work_logs_json = get_work_logs_json_by_ids(jira_client, updated_work_log_ids)
+    cache.store_work_logs(work_logs_json)
+
+    issue_ids = list(dict.fromkeys(int(work_log_json['issueId']) for work_log_json in work_logs_json))
+    cache.store_issues(get_issues_by_ids(jira_client, None, issue_ids))
+
+    deleted_work_log_ids, _ = get_changed_work_log_ids(jira_client, "deleted", since)
+    cache.delete_work_logs(deleted_work_log_ids)
+
+    cache.set_watermark(synced_from, until)
+
+
 def output_to_console(issues, work_logs):
     """Print the work logs to the console
 
-    :param issues: the list of issues which must be printed
+    :param issues: the index of issues keyed by issue key
     :param work_logs: the list of work logs which must be printed
     """
     print("\nThe Jira time report")
     print("====================")
     for work_log in work_logs:
-        work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
+        work_log_issue = issues[work_log.issue_key]
         print(work_log.author + ";" +
               work_log.started.strftime('%Y-%m-%d') + ";" +
               work_log.issue_key + ";" +
@@ -204,20 +503,21 @@ def output_to_console(issues, work_logs):
               str(work_log_issue.parent_summary))
 
 
-def output_to_csv(issues, work_logs):
+def output_to_csv(issues, work_logs, file_name=CSV_FILE_NAME):
     """Print the work logs to a CSV file
 
-    :param issues: the list of issues which must be printed
+    :param issues: the index of issues keyed by issue key
     :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the CSV file
     """
-    with open(CSV_FILE_NAME, 'w', newline='') as csvfile:
+    with open(file_name, 'w', newline='') as csvfile:
         fieldnames = ['author', 'date', 'issue', 'time_spent', 'summary', 'parent', 'parent summary']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames, dialect=csv.unix_dialect)
 
         writer.writeheader()
 
         for work_log in work_logs:
-            work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
+            work_log_issue = issues[work_log.issue_key]
             writer.writerow({'author': work_log.author,
                              'date': work_log.started.strftime('%Y-%m-%d'),
                              'issue': work_log.issue_key,
@@ -227,46 +527,209 @@ def output_to_csv(issues, work_logs):
                              'parent summary': work_log_issue.parent_summary})
 
 
-def output_to_excel(issues, work_logs):
+def output_to_excel(issues, work_logs, file_name=EXCEL_FILE_NAME):
     """Print the work logs to an Excel file
 
-    :param issues: the list of issues which must be printed
+    The workbook is written in constant memory mode, row by row. The date is written as a date and the time spent as a
+    duration, so both can be used in Excel formulas. When the work logs do not fit in a single worksheet, they are
+    continued in a next worksheet.
+
+    :param issues: the index of issues keyed by issue key
     :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the Excel file
     """
-    with xlsxwriter.Workbook(EXCEL_FILE_NAME) as workbook:
-        worksheet = workbook.add_worksheet()
-        row = 0
+    with xlsxwriter.Workbook(file_name, {'constant_memory': True}) as workbook:
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        duration_format = workbook.add_format({'num_format': '[h]:mm:ss'})
+        worksheet = None
+        row = EXCEL_MAX_ROWS
 
         for work_log in work_logs:
-            work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
-            worksheet.write(row, 0, work_log.author)
-            worksheet.write(row, 1, work_log.started.strftime('%Y-%m-%d'))
-            worksheet.write(row, 2, work_log.issue_key)
-            worksheet.write(row, 3, str(timedelta(seconds=work_log.time_spent)))
-            worksheet.write(row, 4, work_log_issue.summary)
-            worksheet.write(row, 5, work_log_issue.parent_key)
-            worksheet.write(row, 6, work_log_issue.parent_summary)
+            if row == EXCEL_MAX_ROWS:
+                worksheet = workbook.add_worksheet()
+                row = 0
+
+            work_log_issue = issues[work_log.issue_key]
+            worksheet.write_string(row, 0, work_log.author)
+            worksheet.write_datetime(row, 1, work_log.started, date_format)
+            worksheet.write_string(row, 2, work_log.issue_key)
+            worksheet.write_number(row, 3, work_log.time_spent / SECONDS_PER_DAY, duration_format)
+            worksheet.write_string(row, 4, work_log_issue.summary)
+            if work_log_issue.parent_key is not None:
+                worksheet.write_string(row, 5, work_log_issue.parent_key)
+                worksheet.write_string(row, 6, work_log_issue.parent_summary)
 
             row += 1
 
 
-def process_work_logs(output, issues, work_logs):
+def output_to_jsonl(issues, work_logs, file_name=JSONL_FILE_NAME):
+    """Print the work logs to a JSON Lines file, one JSON object per work log
+
+    The date is written in the format yyyy-mm-dd and the time spent in seconds.
+
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the JSON Lines file
+    """
+    with open(file_name, 'w', encoding='utf-8') as jsonl_file:
+        for work_log in work_logs:
+            work_log_issue = issues[work_log.issue_key]
+            jsonl_file.write(json.dumps({'author': work_log.author,
+                                         'date': work_log.started.strftime('%Y-%m-%d'),
+                                         'issue': work_log.issue_key,
+                                         'time_spent': work_log.time_spent,
+                                         'summary': work_log_issue.summary,
+                                         'parent': work_log_issue.parent_key,
+                                         'parent_summary': work_log_issue.parent_summary},
+                                        ensure_ascii=False) + "\n")
+
+
+def output_to_parquet(issues, work_logs, file_name=PARQUET_FILE_NAME):
+    """Print the work logs to a Parquet file
+
+    The work logs are written in row groups of PARQUET_BATCH_SIZE work logs. The author and issue columns are dictionary
+    encoded, the date is written as a date and the time spent in seconds. The pyarrow package is required.
+
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the Parquet file
+    """
+    if pyarrow is None:
+        raise ImportError(PARQUET_REQUIREMENT)
+
+    schema = pyarrow.schema([('author', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                             ('date', pyarrow.date32()),
+                             ('issue', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                             ('time_spent', pyarrow.int64()),
+                             ('summary', pyarrow.string()),
+                             ('parent', pyarrow.string()),
+                             ('parent_summary', pyarrow.string())])
+
+    with pyarrow.parquet.ParquetWriter(file_name, schema) as writer:
+        work_logs = iter(work_logs)
+        while True:
+            batch = WorkLogBatch(islice(work_logs, PARQUET_BATCH_SIZE))
+            if not batch:
+                break
+
+            batch_issues = [issues[issue_key] for issue_key in batch.issue_keys]
+            writer.write_table(pyarrow.Table.from_arrays([
+                pyarrow.DictionaryArray.from_arrays(pyarrow.array(batch.author_column, pyarrow.int32()),
+                                                    pyarrow.array(batch.authors, pyarrow.string())),
+                pyarrow.array([ordinal - EPOCH_ORDINAL for ordinal in batch.started_column], pyarrow.date32()),
+                pyarrow.DictionaryArray.from_arrays(pyarrow.array(batch.issue_key_column, pyarrow.int32()),
+                                                    pyarrow.array(batch.issue_keys, pyarrow.string())),
+                pyarrow.array(batch.time_spent_column, pyarrow.int64()),
+                pyarrow.array([batch_issues[code].summary for code in batch.issue_key_column], pyarrow.string()),
+                pyarrow.array([batch_issues[code].parent_key for code in batch.issue_key_column], pyarrow.string()),
+                pyarrow.array([batch_issues[code].parent_summary for code in batch.issue_key_column],
+                              pyarrow.string())],
+                schema=schema))
+
+
+def process_work_logs(output, issues, work_logs, sort_buffer_size=None, file_name=None, metrics=None):
     """Process the retrieved work logs from the Jira API
 
-    The work logs are sorted and printed to the specified output format
+    The work logs are sorted and printed to the specified output format. When a sort buffer size is given, the work logs
+    are sorted by means of an external merge sort, which keeps at most that many work logs in memory and spills the
+    others to disk.
 
     :param output: The output format
-    :param issues: the list of issues which must be printed
-    :param work_logs: the list of work logs which must be printed
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the iterable of work logs which must be printed
+    :param sort_buffer_size: the maximum number of work logs to sort in memory, None to sort all work logs in memory
+    :param file_name: the name of the output file, None for the default file name of the output format
+    :param metrics: the metrics timing the sort and write phases, None to time nothing
     """
-    sorted_on_issue = sorted(work_logs, key=attrgetter('author', 'started', 'issue_key'))
+    with measure_phase(metrics, "sort"):
+        if sort_buffer_size:
+            sorted_on_issue = external_sort(work_logs, WORK_LOG_ORDER, sort_buffer_size)
+        else:
+            sorted_on_issue = sorted(work_logs, key=WORK_LOG_ORDER)
+
+    with measure_phase(metrics, "write"):
+        if output == "csv":
+            output_to_csv(issues, sorted_on_issue, file_name or CSV_FILE_NAME)
+        elif output == "excel":
+            output_to_excel(issues, sorted_on_issue, file_name or EXCEL_FILE_NAME)
+        elif output == "jsonl":
+            output_to_jsonl(issues, sorted_on_issue, file_name or JSONL_FILE_NAME)
+        elif output == "parquet":
+            output_to_parquet(issues, sorted_on_issue, file_name or PARQUET_FILE_NAME)
+        else:
+            output_to_console(issues, sorted_on_issue)
+
+
+def output_table_to_console(header, rows):
+    """Print a table of aggregated work logs to the console
+
+    :param header: the list of column names
+    :param rows: the list of rows which must be printed
+    """
+    print("\nThe Jira time report")
+    print("====================")
+    print(";".join(header))
+    for row in rows:
+        print(";".join(format_table_row(row)))
+
+
+def output_table_to_csv(header, rows, file_name=CSV_FILE_NAME):
+    """Print a table of aggregated work logs to a CSV file
+
+    :param header: the list of column names
+    :param rows: the list of rows which must be printed
+    :param file_name: the name of the CSV file
+    """
+    with open(file_name, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, dialect=csv.unix_dialect)
+        writer.writerow(header)
+        writer.writerows(format_table_row(row) for row in rows)
+
+
+def output_table_to_excel(header, rows, file_name=EXCEL_FILE_NAME):
+    """Print a table of aggregated work logs to an Excel file, the time spent is written as a duration
+
+    :param header: the list of column names
+    :param rows: the list of rows which must be printed
+    :param file_name: the name of the Excel file
+    """
+    with xlsxwriter.Workbook(file_name, {'constant_memory': True}) as workbook:
+        worksheet = workbook.add_worksheet()
+        duration_format = workbook.add_format({'num_format': '[h]:mm:ss'})
+        worksheet.write_row(0, 0, header)
+        for row_number, row in enumerate(rows, start=1):
+            for column_number, cell in enumerate(row):
+                if isinstance(cell, int):
+                    worksheet.write_number(row_number, column_number, cell / SECONDS_PER_DAY, duration_format)
+                elif cell is not None:
+                    worksheet.write_string(row_number, column_number, cell)
+
+
+def process_aggregated_work_logs(output, issues, work_logs, group_by, pivot=None, file_name=None):
+    """Aggregate the retrieved work logs from the Jira API
+
+    The time spent is summed per group and printed to the specified output format. When a pivot field is given, the
+    values of this field become the columns of the report.
+
+    :param output: The output format
+    :param issues: the index of issues keyed by issue key
+    :param work_logs: the iterable of work logs which must be aggregated
+    :param group_by: the list of fields to group by
+    :param pivot: the field of which the values become the columns, or None
+    :param file_name: the name of the output file, None for the default file name of the output format
+    """
+    if pivot:
+        columns, pivot_rows = pivot_work_logs(issues, work_logs, group_by, pivot)
+        header, rows = pivot_to_table(group_by, columns, pivot_rows)
+    else:
+        header, rows = aggregation_to_table(group_by, aggregate_work_logs(issues, work_logs, group_by))
 
     if output == "csv":
-        output_to_csv(issues, sorted_on_issue)
+        output_table_to_csv(header, rows, file_name or CSV_FILE_NAME)
     elif output == "excel":
-        output_to_excel(issues, sorted_on_issue)
+        output_table_to_excel(header, rows, file_name or EXCEL_FILE_NAME)
     else:
-        output_to_console(issues, sorted_on_issue)
+        output_table_to_console(header, rows)
 
 
 def main():
@@ -275,8 +738,9 @@ def main():
     The responsibilities are:
     - parse the arguments
     - retrieve the updated issues
-    - retrieve the work logs of the updated issues
-    - generate the output report
+    - retrieve the work logs of the updated issues, or both at once when the bulk engine is used
+    - generate the output report, or the aggregated report when grouping by fields
+    - write the metrics and the profile when requested
     """
     parser = argparse.ArgumentParser(description='Generate a Jira time report.')
     parser.add_argument('jira_url',
@@ -291,17 +755,191 @@ def main():
                         help='The date to start the time report, format yyyy-mm-dd')
     parser.add_argument('--to_date',
                         help='The date to end the time report (the end date is inclusive), format yyyy-mm-dd')
-    parser.add_argument('--output', choices={"console", "csv", "excel"}, default="console",
+    parser.add_argument('--output', choices={"console", "csv", "excel", "jsonl", "parquet"}, default="console",
                         help='The output format')
     parser.add_argument('--ssl_certificate',
                         help='The location of the SSL certificate, needed in case of self-signed certificates')
+    parser.add_argument('--authors',
+                        help='Only report the work logs of these authors, a comma separated list of account IDs or '
+                             'user names')
+    parser.add_argument('--engine', choices={"search", "bulk", "async"}, default="search",
+                        help='The retrieval engine: search the issues and their work logs, retrieve the updated work '
+                             'logs in bulk, or search the issues and their work logs asynchronously')
+    parser.add_argument('--cache',
+                        help='The location of the local work log cache, only the changes since the previous run are '
+                             'retrieved from Jira')
+    parser.add_argument('--workers', type=int,
+                        help='The number of issues for which the work logs are retrieved concurrently, 1 by default, '
+                             'the number of requests in flight for the async engine, ' + str(ASYNC_CONCURRENCY) +
+                             ' by default')
+    parser.add_argument('--rate_limit', type=float,
+                        help='The maximum number of requests per second sent to Jira')
+    parser.add_argument('--max_retries', type=int, default=5,
+                        help='The maximum number of retries of a throttled or failed request')
+    parser.add_argument('--shards', choices=["issues", "month", "week"],
+                        help='Crawl the report in shards of issues, a month or a week, retrieved in parallel by a pool '
+                             'of processes')
+    parser.add_argument('--processes', type=int,
+                        help='The number of processes crawling the shards, by default the number of CPUs')
+    parser.add_argument('--checkpoint',
+                        help='The location of the journal recording the progress of the crawl, so it can be resumed')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the crawl recorded in the checkpoint journal instead of starting a new one')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the issues and work logs to the output in bounded memory')
+    parser.add_argument('--group_by',
+                        help='Report the time spent summed per group instead of the work logs, a comma separated list '
+                             'of ' + ', '.join(GROUP_BY_FIELDS))
+    parser.add_argument('--pivot', choices=GROUP_BY_FIELDS.keys(),
+                        help='Report the time spent with the values of this field as columns, the rows are grouped by '
+                             'the group_by fields or by author')
+    parser.add_argument('--json_decoder', choices=["auto"] + list(JSON_DECODERS), default="auto",
+                        help='The JSON decoder of the responses, auto uses the fastest one installed')
+    parser.add_argument('--metrics',
+                        help='The location to write the metrics to: the time per phase, counters and the latency '
+                             'histograms per endpoint')
+    parser.add_argument('--metrics_format', choices={"json", "prometheus"}, default="json",
+                        help='The format of the metrics')
+    parser.add_argument('--profile',
+                        help='The location to write the cProfile statistics of the main thread to')
     args = parser.parse_args()
 
-    issues = get_updated_issues(args.jira_url, args.user_name, args.api_token, args.project, args.from_date,
-                                args.to_date, args.ssl_certificate)
-    work_logs = get_work_logs(args.jira_url, args.user_name, args.api_token, args.from_date, args.to_date,
-                              args.ssl_certificate, issues)
-    process_work_logs(args.output, issues, work_logs)
+    if args.output == "parquet" and pyarrow is None:
+        parser.error(PARQUET_REQUIREMENT)
+    if args.workers is None:
+        args.workers = ASYNC_CONCURRENCY if args.engine == "async" else 1
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.processes is not None and args.processes < 1:
+        parser.error("--processes must be at least 1")
+    authors = [author.strip() for author in args.authors.split(',')] if args.authors else None
+    if authors and args.cache:
+        parser.error("--authors cannot be combined with --cache")
+    if args.cache and (args.stream or args.engine != "search"):
+        parser.error("--cache cannot be combined with --stream or another engine than search")
+    if args.shards and (args.cache or args.stream or args.engine != "search"):
+        parser.error("--shards cannot be combined with --cache, --stream or another engine than search")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.checkpoint and (args.cache or args.stream or args.shards or args.engine != "search"):
+        parser.error("--checkpoint cannot be combined with --cache, --stream, --shards or another engine than search")
+
+    group_by = None
+    if args.group_by is not None or args.pivot:
+        try:
+            group_by = parse_group_by("author" if args.group_by is None else args.group_by)
+        except ValueError as error:
+            parser.error(str(error))
+        if args.output not in AGGREGATED_OUTPUTS:
+            parser.error("--group_by and --pivot support the " + ", ".join(sorted(AGGREGATED_OUTPUTS)) + " output")
+
+    try:
+        json_decoder = get_json_decoder(args.json_decoder)
+    except ValueError as error:
+        parser.error(str(error))
+
+    metrics = Metrics() if args.metrics else None
+    profile = cProfile.Profile() if args.profile else None
+    if profile:
+        profile.enable()
+
+    scheduler = RequestScheduler(rate_limit=args.rate_limit, max_in_flight=args.workers, max_retries=args.max_retries)
+    with JiraClient(args.jira_url, args.user_name, args.api_token, args.ssl_certificate,
+                    pool_size=args.workers, scheduler=scheduler, metrics=metrics,
+                    json_decoder=json_decoder) as jira_client:
+        sort_buffer_size = None
+        if args.cache:
+            try:
+                project_key = get_project_key(jira_client, args.project)
+            except ValueError as error:
+                parser.error(str(error))
+            with WorkLogCache(args.cache) as cache:
+                with measure_phase(metrics, "sync_cache"):
+                    sync_work_log_cache(jira_client, cache, args.from_date)
+                with measure_phase(metrics, "read_cache"):
+                    issues, work_logs = cache.get_issues_and_work_logs(project_key,
+                                                                       datetime.strptime(args.from_date, "%Y-%m-%d"),
+                                                                       convert_to_date(args.to_date))
+        elif args.engine == "bulk":
+            with measure_phase(metrics, "retrieve"):
+                issues, work_logs = get_work_logs_bulk(jira_client, args.project, args.from_date, args.to_date,
+                                                       authors)
+        elif args.engine == "async":
+            # Imported here, as the async engine builds on the functions of this module
+            from asyncengine import get_issues_and_work_logs_async
+            with measure_phase(metrics, "retrieve"):
+                issues, work_logs = get_issues_and_work_logs_async(args.jira_url, args.user_name, args.api_token,
+                                                                   args.ssl_certificate, args.project, args.from_date,
+                                                                   args.to_date, args.workers, authors, scheduler,
+                                                                   metrics, json_decoder)
+        elif args.shards:
+            # Imported here, as the sharded crawl builds on the functions of this module
+            from shardedcrawl import get_work_logs_sharded
+            connection = {
+                'jira_url': args.jira_url,
+                'user_name': args.user_name,
+                'api_token': args.api_token,
+                'ssl_certificate': args.ssl_certificate,
+                'rate_limit': args.rate_limit,
+                'max_retries': args.max_retries
+            }
+            with measure_phase(metrics, "retrieve"):
+                issues, work_logs = get_work_logs_sharded(connection, args.project, args.from_date, args.to_date,
+                                                          args.shards, args.processes, args.workers, authors,
+                                                          metrics=metrics)
+        elif args.checkpoint:
+            # Imported here, as the resumable crawl builds on the functions of this module
+            from crawljournal import CrawlJournal, get_updated_issues_resumable, get_work_logs_resumable
+            # The end date is resolved, so a crawl without a to_date is not resumed on a later day with another JQL query
+            to_date = args.to_date or date.today().isoformat()
+            settings = {'jira_url': args.jira_url, 'project': args.project, 'from_date': args.from_date,
+                        'to_date': to_date, 'authors': authors}
+            try:
+                journal = CrawlJournal(args.checkpoint, settings, args.resume)
+            except ValueError as error:
+                parser.error(str(error))
+            with journal:
+                with measure_phase(metrics, "search_issues"):
+                    issues = get_updated_issues_resumable(jira_client, journal, args.project, args.from_date,
+                                                          to_date, authors)
+                with measure_phase(metrics, "retrieve_work_logs"):
+                    work_logs = get_work_logs_resumable(jira_client, journal, args.from_date, to_date,
+                                                        list(issues.values()), args.workers, authors)
+        elif args.stream:
+            # The issues and work logs are retrieved while they are written, so the retrieval is part of the write phase
+            issues = IssueIndex()
+            updated_issues = issues.indexing(iter_updated_issues(jira_client, args.project, args.from_date,
+                                                                 args.to_date, authors))
+            work_logs = iter_work_logs(jira_client, args.from_date, args.to_date, updated_issues, args.workers,
+                                       authors)
+            sort_buffer_size = SORT_BUFFER_SIZE
+        else:
+            with measure_phase(metrics, "search_issues"):
+                issues = get_updated_issues(jira_client, args.project, args.from_date, args.to_date, authors)
+            with measure_phase(metrics, "retrieve_work_logs"):
+                work_logs = get_work_logs(jira_client, args.from_date, args.to_date, issues.values(), args.workers,
+                                          authors)
+        if metrics:
+            work_logs = metrics.counting("work_logs", work_logs)
+        if group_by:
+            with measure_phase(metrics, "aggregate_and_write"):
+                process_aggregated_work_logs(args.output, issues, work_logs, group_by, args.pivot)
+        else:
+            process_work_logs(args.output, issues, work_logs, sort_buffer_size, metrics=metrics)
+
+    if profile:
+        profile.disable()
+        profile.dump_stats(args.profile)
+
+    if metrics:
+        metrics.count("issues", len(issues))
+        metrics.count_scheduler(scheduler)
+        with open(args.metrics, "w") as metrics_file:
+            metrics_file.write(metrics.to_prometheus() if args.metrics_format == "prometheus" else metrics.to_json())
+
+    if scheduler.retries:
+        print("Retried " + str(scheduler.retries) + " of " + str(scheduler.requests) + " requests, throttled " +
+              str(round(scheduler.throttle_time, 1)) + " seconds", file=sys.stderr)
 
 
 if __name__ == "__main__":
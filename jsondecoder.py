@@ -0,0 +1,37 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+JSON_DECODERS = {
+    'orjson': orjson.loads if orjson else None,
+    'simdjson': simdjson.loads if simdjson else None,
+    'json': json.loads
+}
+
+
+def get_json_decoder(name="auto"):
+    """Get a function decoding the raw bytes of a JSON response body into Python objects
+
+    The orjson and simdjson packages parse the UTF-8 bytes directly, without decoding them into a string first. They
+    return the same dicts, lists, strings and numbers as the json module of the standard library, which is the fallback
+    when neither is installed.
+
+    :param name: the name of the decoder, one of JSON_DECODERS, or auto for the fastest decoder installed
+    :return: the function decoding bytes into Python objects
+    """
+    if name == "auto":
+        return next(decoder for decoder in JSON_DECODERS.values() if decoder)
+
+    if name not in JSON_DECODERS:
+        raise ValueError("Invalid JSON decoder " + name + ", choose from auto, " + ", ".join(JSON_DECODERS))
+    if JSON_DECODERS[name] is None:
+        raise ValueError("The " + name + " JSON decoder requires the " + name + " package, install it by means of "
+                         "pip install " + name)
+    return JSON_DECODERS[name]
@@ -0,0 +1,244 @@
+from contextlib import contextmanager, nullcontext
+import json
+import re
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "jiratimereport_"
+
+
+class Metrics:
+    """A Metrics object will collect the timing of the phases of a report, counters and the latency of the requests
+
+    The latency, number of requests, errors and bytes received are kept per endpoint, the issue key in the URL of an
+    endpoint is replaced by {key}. The metrics are thread safe, can be transferred between processes and merged, and can
+    be written as JSON or in the Prometheus text format.
+    """
+    def __init__(self, clock=time.perf_counter):
+        """
+        :param clock: the function returning a monotonic time in seconds
+        """
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.counters = {}
+        self.endpoints = {}
+
+    def __getstate__(self):
+        # The lock and clock are not transferred to another process, the clock may be a local function
+        state = self.__dict__.copy()
+        del state['lock'], state['clock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.clock = time.perf_counter
+        self.lock = threading.Lock()
+
+    def merge(self, other):
+        """Add the counters and the request statistics of other metrics, e.g. collected in another process
+
+        The phases are not merged, as the phases of other processes run in parallel to the phases of this one.
+
+        :param other: the other metrics
+        """
+        with self.lock:
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for endpoint, other_statistics in other.endpoints.items():
+                statistics = self.endpoints.setdefault(endpoint, create_endpoint_statistics())
+                for field in ('requests', 'errors', 'bytes', 'latency_sum'):
+                    statistics[field] += other_statistics[field]
+                statistics['latency_buckets'] = [count + other_count for count, other_count in
+                                                 zip(statistics['latency_buckets'], other_statistics['latency_buckets'])]
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the report, the time of a phase entered more than once is summed
+
+        :param name: the name of the phase
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, name, value=1):
+        """Add a value to a counter
+
+        :param name: the name of the counter
+        :param value: the value to add
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_scheduler(self, scheduler):
+        """Add the number of requests and retries and the throttle time of a request scheduler to the counters
+
+        :param scheduler: the request scheduler
+        """
+        self.count("requests", scheduler.requests)
+        self.count("retries", scheduler.retries)
+        self.count("throttle_seconds", round(scheduler.throttle_time, 3))
+
+    def counting(self, name, items):
+        """Count the items of an iterable while they are iterated
+
+        :param name: the name of the counter
+        :param items: the iterable
+        :return: a generator of the items
+        """
+        number_of_items = 0
+        try:
+            for item in items:
+                number_of_items += 1
+                yield item
+        finally:
+            self.count(name, number_of_items)
+
+    def measure_request(self, url, send):
+        """Wrap a function sending a request to record its latency, status and size per endpoint
+
+        :param url: the Jira URL relative to the base Jira URL of the request
+        :param send: the function sending the request and returning the response
+        :return: the wrapped function
+        """
+        def measured_send():
+            start = self.clock()
+            response = None
+            try:
+                response = send()
+                return response
+            finally:
+                self.record_request(url, self.clock() - start, response)
+
+        return measured_send
+
+    def measure_request_async(self, url, send):
+        """Wrap a coroutine function sending a request to record its latency, status and size per endpoint
+
+        :param url: the Jira URL relative to the base Jira URL of the request
+        :param send: the coroutine function sending the request and returning the response
+        :return: the wrapped coroutine function
+        """
+        async def measured_send():
+            start = self.clock()
+            response = None
+            try:
+                response = await send()
+                return response
+            finally:
+                self.record_request(url, self.clock() - start, response)
+
+        return measured_send
+
+    def record_request(self, url, latency, response):
+        """Record a single attempt of a request
+
+        :param url: the Jira URL relative to the base Jira URL of the request
+        :param latency: the number of seconds until the response was received
+        :param response: the response, or None when the request raised an exception
+        """
+        endpoint = get_endpoint(url)
+        with self.lock:
+            statistics = self.endpoints.setdefault(endpoint, create_endpoint_statistics())
+            statistics['requests'] += 1
+            if response is None or response.status_code >= 400:
+                statistics['errors'] += 1
+            if response is not None:
+                statistics['bytes'] += len(response.content)
+            statistics['latency_sum'] += latency
+            for index, bucket in enumerate(LATENCY_BUCKETS):
+                if latency <= bucket:
+                    statistics['latency_buckets'][index] += 1
+
+    def to_json(self):
+        """Get the metrics as a JSON document
+
+        :return: the JSON text
+        """
+        with self.lock:
+            endpoints = {}
+            for endpoint, statistics in sorted(self.endpoints.items()):
+                buckets = {str(bucket): count for bucket, count in zip(LATENCY_BUCKETS, statistics['latency_buckets'])}
+                buckets['+Inf'] = statistics['requests']
+                endpoints[endpoint] = {
+                    'requests': statistics['requests'],
+                    'errors': statistics['errors'],
+                    'bytes': statistics['bytes'],
+                    'latency': {'buckets': buckets, 'sum': round(statistics['latency_sum'], 6),
+                                'count': statistics['requests']}
+                }
+            return json.dumps({
+                'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                'counters': dict(sorted(self.counters.items())),
+                'endpoints': endpoints
+            }, indent=2)
+
+    def to_prometheus(self):
+        """Get the metrics in the Prometheus text exposition format
+
+        :return: the text
+        """
+        lines = []
+        with self.lock:
+            lines.append("# TYPE " + METRIC_PREFIX + "phase_seconds gauge")
+            for name, seconds in self.phases.items():
+                lines.append(METRIC_PREFIX + 'phase_seconds{phase="' + name + '"} ' + repr(round(seconds, 6)))
+            for name, value in sorted(self.counters.items()):
+                lines.append("# TYPE " + METRIC_PREFIX + name + " gauge")
+                lines.append(METRIC_PREFIX + name + " " + str(value))
+
+            for name, field in [("requests_total", 'requests'), ("request_errors_total", 'errors'),
+                                ("response_bytes_total", 'bytes')]:
+                lines.append("# TYPE " + METRIC_PREFIX + name + " counter")
+                for endpoint, statistics in sorted(self.endpoints.items()):
+                    lines.append(METRIC_PREFIX + name + '{endpoint="' + endpoint + '"} ' + str(statistics[field]))
+
+            name = METRIC_PREFIX + "request_duration_seconds"
+            lines.append("# TYPE " + name + " histogram")
+            for endpoint, statistics in sorted(self.endpoints.items()):
+                for bucket, count in zip(LATENCY_BUCKETS, statistics['latency_buckets']):
+                    lines.append(name + '_bucket{endpoint="' + endpoint + '",le="' + str(bucket) + '"} ' + str(count))
+                lines.append(name + '_bucket{endpoint="' + endpoint + '",le="+Inf"} ' + str(statistics['requests']))
+                lines.append(name + '_sum{endpoint="' + endpoint + '"} ' + repr(round(statistics['latency_sum'], 6)))
+                lines.append(name + '_count{endpoint="' + endpoint + '"} ' + str(statistics['requests']))
+
+        return "\n".join(lines) + "\n"
+
+
+def create_endpoint_statistics():
+    """Create the statistics of an endpoint without any requests
+
+    :return: a dict with the number of requests, errors and bytes, the latency histogram and the sum of the latencies
+    """
+    return {
+        'requests': 0,
+        'errors': 0,
+        'bytes': 0,
+        'latency_buckets': [0] * len(LATENCY_BUCKETS),
+        'latency_sum': 0.0
+    }
+
+
+def get_endpoint(url):
+    """Get the endpoint of a Jira URL, the issue key or ID in the URL is replaced by {key}
+
+    :param url: the Jira URL relative to the base Jira URL
+    :return: the endpoint, e.g. /rest/api/2/issue/{key}/worklog
+    """
+    return re.sub(r"/issue/[^/]+", "/issue/{key}", url).rstrip("/")
+
+
+def measure_phase(metrics, name):
+    """Time a phase of the report when metrics are collected
+
+    :param metrics: the metrics, or None when no metrics are collected
+    :param name: the name of the phase
+    :return: a context manager timing the phase
+    """
+    return metrics.phase(name) if metrics else nullcontext()
@@ -0,0 +1,340 @@
+import argparse
+from bisect import bisect_left
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from urllib.parse import parse_qs, urlparse
+
+from aggregation import GROUP_BY_FIELDS, parse_group_by
+from batchreport import OUTPUTS
+from jiraclient import JiraClient
+from jiratimereport import AGGREGATED_OUTPUTS, convert_to_date, get_project_key, process_aggregated_work_logs, \
+    process_work_logs, sync_work_log_cache
+from requestscheduler import RequestScheduler
+from worklog import parse_date
+from worklogcache import WorkLogCache
+
+CONTENT_TYPES = {
+    "console": "text/plain; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+FILE_EXTENSIONS = {"csv": ".csv", "excel": ".xlsx", "jsonl": ".jsonl", "parquet": ".parquet"}
+END_OF_TIME = datetime(9999, 12, 31)
+DEFAULT_REFRESH_INTERVAL = 300
+
+# The console output is printed, which is captured by redirecting the standard output of the whole process
+CONSOLE_LOCK = threading.Lock()
+
+
+class ProjectWorkLogs:
+    """A ProjectWorkLogs object will hold the issues and work logs of a project, indexed by date and author
+
+    The work logs are sorted by their started date, so the work logs of a date range are found by a binary search. The
+    work logs of every author are kept in a separate sorted list as well.
+    """
+    def __init__(self, issues, work_logs):
+        """
+        :param issues: the index of issues keyed by issue key
+        :param work_logs: the iterable of work logs of the issues
+        """
+        self.issues = issues
+        self.work_logs = sorted(work_logs, key=lambda work_log: work_log.started)
+        self.days = [work_log.started.toordinal() for work_log in self.work_logs]
+        self.work_logs_per_author = {}
+        for work_log in self.work_logs:
+            self.work_logs_per_author.setdefault(work_log.author, []).append(work_log)
+        self.days_per_author = {author: [work_log.started.toordinal() for work_log in work_logs]
+                                for author, work_logs in self.work_logs_per_author.items()}
+
+    def select(self, from_date, to_date, authors=None):
+        """Select the work logs which have been started in a date range
+
+        :param from_date The date to start the report as a datetime
+        :param to_date The date to end the report (exclusive) as a datetime
+        :param authors: the names of the authors, None for all authors
+        :return: the list of work logs
+        """
+        if authors is None:
+            return self.select_range(self.work_logs, self.days, from_date, to_date)
+
+        return [work_log for author in authors if author in self.work_logs_per_author
+                for work_log in self.select_range(self.work_logs_per_author[author], self.days_per_author[author],
+                                                  from_date, to_date)]
+
+    @staticmethod
+    def select_range(work_logs, days, from_date, to_date):
+        return work_logs[bisect_left(days, from_date.toordinal()):bisect_left(days, to_date.toordinal())]
+
+
+class ReportIndex:
+    """A ReportIndex object will hold the work logs of the projects served, replaced as a whole on every refresh
+
+    Next to the projects, the index holds the date from which the work logs are served, the moment of the last refresh
+    and the error of the last failed refresh.
+    """
+    def __init__(self):
+        self.projects = {}
+        self.from_date = None
+        self.last_refresh = None
+        self.refresh_error = None
+
+    def load(self, project, issues, work_logs):
+        """Replace the issues and work logs of a project
+
+        :param project: the Jira project
+        :param issues: the index of issues keyed by issue key
+        :param work_logs: the iterable of work logs of the issues
+        """
+        self.projects = dict(self.projects, **{project: ProjectWorkLogs(issues, work_logs)})
+
+    def get_status(self):
+        """Get the status of the index
+
+        :return: a dict with the number of issues and work logs per project, the served from date and the refresh status
+        """
+        return {
+            'projects': {project: {'issues': len(project_work_logs.issues),
+                                   'work_logs': len(project_work_logs.work_logs)}
+                         for project, project_work_logs in self.projects.items()},
+            'from_date': self.from_date.strftime("%Y-%m-%d") if self.from_date else None,
+            'last_refresh': self.last_refresh.isoformat(timespec='seconds') if self.last_refresh else None,
+            'refresh_error': self.refresh_error
+        }
+
+
+def refresh_index(jira_client, cache, index, projects, from_date):
+    """Synchronize the work log cache with Jira and reload the projects into the index
+
+    Only the work logs changed since the previous refresh are retrieved from Jira.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param cache: the work log cache
+    :param index: the report index to reload
+    :param projects: the list of Jira projects to serve
+    :param from_date The date from which the work logs are served, format yyyy-mm-dd
+    """
+    sync_work_log_cache(jira_client, cache, from_date)
+    index.from_date = parse_date(from_date)
+    for project in projects:
+        issues, work_logs = cache.get_issues_and_work_logs(project, index.from_date, END_OF_TIME)
+        index.load(project, issues, work_logs)
+    index.last_refresh = datetime.now()
+    index.refresh_error = None
+
+
+def refresh_periodically(jira_client, cache_file_name, index, projects, from_date, interval, ready, stop):
+    """Refresh the index until stopped, meant to run in a background thread
+
+    The work log cache is opened in this thread, as a SQLite connection can only be used by the thread which created it.
+    A failed refresh is reported and retried after the interval, the index keeps serving the previous work logs.
+
+    :param jira_client: The client to use for connecting to Jira
+    :param cache_file_name: the location of the work log cache, ":memory:" for a cache which is not persisted
+    :param index: the report index to refresh
+    :param projects: the list of Jira projects to serve
+    :param from_date The date from which the work logs are served, format yyyy-mm-dd
+    :param interval: the number of seconds between two refreshes
+    :param ready: the event set after the first refresh
+    :param stop: the event to stop refreshing
+    """
+    try:
+        with WorkLogCache(cache_file_name) as cache:
+            while True:
+                try:
+                    refresh_index(jira_client, cache, index, projects, from_date)
+                except Exception as error:
+                    # Any failure, like an unexpected payload or a locked cache, must not end the refreshes
+                    index.refresh_error = repr(error)
+                    print("Refresh failed: " + repr(error), file=sys.stderr)
+                ready.set()
+                if stop.wait(interval):
+                    break
+    finally:
+        ready.set()
+
+
+def create_report(index, query):
+    """Create a report from the index
+
+    The query contains the project, from_date and the optional to_date, output (console by default), authors, group_by
+    and pivot, with the same meaning as the arguments of jiratimereport.py. The authors are the names as reported. The
+    from_date must not be before the date from which the index serves the work logs.
+
+    :param index: the report index
+    :param query: the parsed query string of the request
+    :return: a tuple of the content type and the bytes of the report
+    """
+    def get(name, default=None):
+        return query[name][0] if query.get(name) and query[name][0] else default
+
+    project = get('project')
+    if project not in index.projects:
+        raise ValueError("The project " + str(project) + " is not served, choose from " + ", ".join(index.projects))
+    from_date = get('from_date')
+    if not from_date:
+        raise ValueError("A from_date is required")
+    try:
+        from_date_dt = datetime.strptime(from_date, "%Y-%m-%d")
+        to_date_dt = convert_to_date(get('to_date'))
+    except ValueError:
+        raise ValueError("The from_date and to_date must have the format yyyy-mm-dd")
+    if from_date_dt < index.from_date:
+        # The index lacks the earlier work logs, a report from an earlier date would be silently incomplete
+        raise ValueError("The from_date must not be before " + index.from_date.strftime("%Y-%m-%d") +
+                         ", from which the work logs are served")
+    output = get('output', "console")
+    if output not in OUTPUTS:
+        raise ValueError("Invalid output " + output + ", choose from " + ", ".join(sorted(OUTPUTS)))
+    authors = [author.strip() for author in get('authors').split(',')] if get('authors') else None
+    pivot = get('pivot')
+    if pivot and pivot not in GROUP_BY_FIELDS:
+        raise ValueError("Invalid pivot " + pivot + ", choose from " + ", ".join(GROUP_BY_FIELDS))
+    group_by = None
+    if get('group_by') or pivot:
+        if output not in AGGREGATED_OUTPUTS:
+            raise ValueError("Cannot aggregate to the " + output + " output")
+        group_by = parse_group_by(get('group_by', "author"))
+
+    project_work_logs = index.projects[project]
+    issues = project_work_logs.issues
+    work_logs = project_work_logs.select(from_date_dt, to_date_dt, authors)
+
+    def process(file_name=None):
+        if group_by:
+            process_aggregated_work_logs(output, issues, work_logs, group_by, pivot, file_name)
+        else:
+            process_work_logs(output, issues, work_logs, file_name=file_name)
+
+    if output == "console":
+        console = io.StringIO()
+        with CONSOLE_LOCK, redirect_stdout(console):
+            process()
+        return CONTENT_TYPES[output], console.getvalue().encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "report" + FILE_EXTENSIONS[output])
+        process(file_name)
+        with open(file_name, "rb") as report_file:
+            return CONTENT_TYPES[output], report_file.read()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """The request handler of the report server, serving GET /report and GET /status from the index of the server
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/status":
+            self.respond(200, "application/json", json.dumps(self.server.index.get_status()).encode("utf-8"))
+        elif url.path == "/report":
+            try:
+                content_type, body = create_report(self.server.index, parse_qs(url.query))
+            except ValueError as error:
+                self.respond_error(400, error)
+            except ImportError as error:
+                self.respond_error(501, error)
+            else:
+                self.respond(200, content_type, body)
+        else:
+            self.respond_error(404, "Not found")
+
+    def respond_error(self, status, error):
+        self.respond(status, "application/json", json.dumps({'error': str(error)}).encode("utf-8"))
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(index, host, port):
+    """Create the HTTP server serving the reports of an index
+
+    :param index: the report index
+    :param host: the host name or address to listen on
+    :param port: the port to listen on, 0 for a free port
+    :return: the HTTP server
+    """
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    server.daemon_threads = True
+    server.index = index
+    return server
+
+
+def main():
+    """The main entry point of the report server
+
+    The responsibilities are:
+    - parse the arguments
+    - load the work logs of the projects into the index and refresh them in the background
+    - serve the reports from the index
+    """
+    parser = argparse.ArgumentParser(description='Serve Jira time reports from an index kept in memory.')
+    parser.add_argument('jira_url',
+                        help='The Jira URL')
+    parser.add_argument('user_name',
+                        help='The user name to use for connecting to Jira')
+    parser.add_argument('api_token',
+                        help='The API token to use for connecting to Jira')
+    parser.add_argument('projects',
+                        help='The comma separated keys of the Jira projects to serve')
+    parser.add_argument('from_date',
+                        help='The date from which the work logs are served, format yyyy-mm-dd')
+    parser.add_argument('--ssl_certificate',
+                        help='The location of the SSL certificate, needed in case of self-signed certificates')
+    parser.add_argument('--host', default="127.0.0.1",
+                        help='The host name or address to listen on')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='The port to listen on')
+    parser.add_argument('--cache', default=":memory:",
+                        help='The location of the local work log cache, by default the cache is kept in memory')
+    parser.add_argument('--refresh_interval', type=float, default=DEFAULT_REFRESH_INTERVAL,
+                        help='The number of seconds between two refreshes of the work logs')
+    parser.add_argument('--rate_limit', type=float,
+                        help='The maximum number of requests per second sent to Jira')
+    parser.add_argument('--max_retries', type=int, default=5,
+                        help='The maximum number of retries of a throttled or failed request')
+    args = parser.parse_args()
+
+    projects = [project.strip() for project in args.projects.split(',') if project.strip()]
+    index = ReportIndex()
+    ready = threading.Event()
+    stop = threading.Event()
+    scheduler = RequestScheduler(rate_limit=args.rate_limit, max_in_flight=1, max_retries=args.max_retries)
+    with JiraClient(args.jira_url, args.user_name, args.api_token, args.ssl_certificate, pool_size=1,
+                    scheduler=scheduler) as jira_client:
+        try:
+            projects = [get_project_key(jira_client, project) for project in projects]
+        except ValueError as error:
+            parser.error(str(error))
+        refresher = threading.Thread(target=refresh_periodically,
+                                     args=(jira_client, args.cache, index, projects, args.from_date,
+                                           args.refresh_interval, ready, stop),
+                                     daemon=True)
+        refresher.start()
+        ready.wait()
+
+        with create_server(index, args.host, args.port) as server:
+            print("Serving the reports of " + ", ".join(projects) + " on http://" + args.host + ":" +
+                  str(server.server_port), file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                stop.set()
+                refresher.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import threading
+import time
+
+import requests
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RequestScheduler:
+    """A RequestScheduler object will pace the requests to the Jira server
+
+    The scheduler limits the request rate by means of a token bucket, bounds the number of requests in flight and retries
+    throttled (429) and failed (5xx) requests and connection errors with an exponential backoff. A Retry-After header
+    sent by the server takes precedence over the backoff. The number of requests, retries and the time spent waiting are
+    counted.
+    """
+    def __init__(self, rate_limit=None, max_in_flight=10, max_retries=5, backoff=1.0, max_backoff=60.0,
+                 sleep=time.sleep, clock=time.monotonic, async_sleep=asyncio.sleep):
+        """
+        :param rate_limit: the maximum number of requests per second, None for no limit
+        :param max_in_flight: the maximum number of requests in flight at the same time
+        :param max_retries: the maximum number of retries of a single request
+        :param backoff: the delay in seconds before the first retry, doubled for every next retry
+        :param max_backoff: the maximum delay in seconds before a retry
+        :param sleep: the function to wait a number of seconds
+        :param clock: the function returning a monotonic time in seconds
+        :param async_sleep: the coroutine function to wait a number of seconds in asynchronous requests
+        """
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.clock = clock
+        self.async_sleep = async_sleep
+        self.in_flight = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self.lock = threading.Lock()
+        self.tokens = max(rate_limit, 1.0) if rate_limit else 0.0
+        self.last_refill = clock()
+        self.requests = 0
+        self.retries = 0
+        self.throttle_time = 0.0
+
+    def execute(self, send):
+        """Execute a request, retrying it when it is throttled or fails
+
+        :param send: the function sending the request and returning the response
+        :return: the response of the last attempt
+        """
+        attempt = 0
+        while True:
+            self.wait(self.acquire_token())
+            with self.in_flight:
+                with self.lock:
+                    self.requests += 1
+                try:
+                    response = send()
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+
+            if response is not None and (response.status_code not in RETRY_STATUS_CODES or
+                                         attempt >= self.max_retries):
+                return response
+
+            self.wait(self.count_retry(response, attempt))
+            attempt += 1
+
+    async def execute_async(self, send, retry_exceptions=()):
+        """Execute an asynchronous request, retrying it when it is throttled or fails
+
+        The number of requests in flight is not bounded by the scheduler, the asynchronous caller bounds it itself.
+
+        :param send: the coroutine function sending the request and returning the response
+        :param retry_exceptions: the exception types of the HTTP client which are retried, like connection errors
+        :return: the response of the last attempt
+        """
+        attempt = 0
+        while True:
+            await self.wait_async(self.acquire_token())
+            with self.lock:
+                self.requests += 1
+            try:
+                response = await send()
+            except retry_exceptions:
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+
+            if response is not None and (response.status_code not in RETRY_STATUS_CODES or
+                                         attempt >= self.max_retries):
+                return response
+
+            await self.wait_async(self.count_retry(response, attempt))
+            attempt += 1
+
+    def count_retry(self, response, attempt):
+        """Count a retry and get the delay before it
+
+        :param response: the response of the failed attempt, or None in case of a connection error
+        :param attempt: the number of the failed attempt, starting at 0
+        :return: the number of seconds to wait before the retry
+        """
+        delay = self.get_retry_after(response)
+        if delay is None:
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        with self.lock:
+            self.retries += 1
+        return delay
+
+    def acquire_token(self):
+        """Take a token from the bucket
+
+        :return: the number of seconds to wait before the token may be used
+        """
+        if not self.rate_limit:
+            return 0.0
+
+        with self.lock:
+            now = self.clock()
+            capacity = max(self.rate_limit, 1.0)
+            self.tokens = min(capacity, self.tokens + (now - self.last_refill) * self.rate_limit)
+            self.last_refill = now
+            self.tokens -= 1
+            return -self.tokens / self.rate_limit if self.tokens < 0 else 0.0
+
+    def wait(self, delay):
+        """Wait a number of seconds and count it as throttle time
+
+        :param delay: the number of seconds to wait
+        """
+        if delay > 0:
+            with self.lock:
+                self.throttle_time += delay
+            self.sleep(delay)
+
+    async def wait_async(self, delay):
+        """Wait a number of seconds without blocking the event loop and count it as throttle time
+
+        :param delay: the number of seconds to wait
+        """
+        if delay > 0:
+            with self.lock:
+                self.throttle_time += delay
+            await self.async_sleep(delay)
+
+    @staticmethod
+    def get_retry_after(response):
+        """Get the delay requested by the server by means of the Retry-After header
+
+        :param response: the response of the server, or None in case of a connection error
+        :return: the number of seconds to wait, or None when the server did not send a valid Retry-After header
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if not retry_after:
+            return None
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,166 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+import heapq
+import os
+
+from issue import IssueIndex
+from jiraclient import JiraClient
+from jiratimereport import convert_to_date, get_updated_issues, get_work_logs, WORK_LOG_ORDER
+from metrics import Metrics
+from requestscheduler import RequestScheduler
+from worklog import WorkLogBatch
+
+SHARD_PERIODS = {"month", "week"}
+ISSUE_SHARDS_PER_PROCESS = 4
+
+
+def get_date_shards(from_date, to_date, period):
+    """Split a date range into shards of a calendar month or a week
+
+    The first and last shard are clipped to the date range.
+
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param period: the period of a shard, month or week
+    :return: the list of tuples of the from and to date (inclusive) of every shard, format yyyy-mm-dd
+    """
+    if period not in SHARD_PERIODS:
+        raise ValueError("Invalid shard period " + period + ", choose from " + ", ".join(sorted(SHARD_PERIODS)))
+
+    shard_from = date.fromisoformat(from_date)
+    last_date = convert_to_date(to_date).date() - timedelta(days=1)
+    shards = []
+    while shard_from <= last_date:
+        if period == "month":
+            next_month = shard_from.replace(day=1) + timedelta(days=32)
+            shard_to = next_month.replace(day=1) - timedelta(days=1)
+        else:
+            shard_to = shard_from + timedelta(days=6)
+        shard_to = min(shard_to, last_date)
+        shards.append((shard_from.isoformat(), shard_to.isoformat()))
+        shard_from = shard_to + timedelta(days=1)
+
+    return shards
+
+
+def get_issue_shards(issues, number_of_shards):
+    """Split the issues into shards of consecutive issues of about the same size
+
+    :param issues: the list of issues
+    :param number_of_shards: the maximum number of shards
+    :return: the list of lists of issues
+    """
+    shard_size = max(-(-len(issues) // max(number_of_shards, 1)), 1)
+    return [issues[start:start + shard_size] for start in range(0, len(issues), shard_size)]
+
+
+def create_jira_client(connection, workers, metrics=None):
+    """Create a Jira client with its own request scheduler
+
+    :param connection: a dict with the jira_url, user_name, api_token, ssl_certificate, rate_limit and max_retries
+    :param workers: the number of requests in flight
+    :param metrics: the metrics recording the latency and size of every request, None to record nothing
+    :return: the Jira client
+    """
+    scheduler = RequestScheduler(rate_limit=connection['rate_limit'], max_in_flight=workers,
+                                 max_retries=connection['max_retries'])
+    return JiraClient(connection['jira_url'], connection['user_name'], connection['api_token'],
+                      connection['ssl_certificate'], pool_size=workers, scheduler=scheduler, metrics=metrics)
+
+
+def crawl_shard(connection, project, from_date, to_date, workers=1, authors=None, issues=None, measure=False):
+    """Retrieve the issues and work logs of a single shard, in a worker process with its own Jira client
+
+    The work logs are sorted in the worker and returned as a WorkLogBatch, which is much cheaper to transfer between
+    processes than the separate work logs. The metrics of the requests of the shard are returned as well, so they can
+    be merged into the metrics of the report.
+
+    :param connection: a dict with the jira_url, user_name, api_token, ssl_certificate, rate_limit and max_retries
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the shard, format yyyy-mm-dd
+    :param to_date The date to end the shard (the end date is inclusive), format yyyy-mm-dd
+    :param workers: the number of issues for which the work logs are retrieved concurrently
+    :param authors: the account IDs or user names of the authors, None for all authors
+    :param issues: the list of issues of the shard, None to search the issues updated in the date range of the shard
+    :param measure: True to collect the metrics of the requests of the shard
+    :return: a tuple of the list of issues, the batch of sorted work logs and the metrics, None when not measured
+    """
+    metrics = Metrics() if measure else None
+    with create_jira_client(connection, workers, metrics) as jira_client:
+        if issues is None:
+            issues = list(get_updated_issues(jira_client, project, from_date, to_date, authors).values())
+        work_logs = get_work_logs(jira_client, from_date, to_date, issues, workers, authors)
+    if metrics:
+        metrics.count_scheduler(jira_client.scheduler)
+
+    return issues, WorkLogBatch(sorted(work_logs, key=WORK_LOG_ORDER)), metrics
+
+
+def get_work_logs_sharded(connection, project, from_date, to_date, period="month", processes=None, workers=1,
+                          authors=None, shard_retries=2, crawl=crawl_shard, metrics=None):
+    """Retrieve the issues and work logs from Jira by means of a pool of processes, each crawling a shard
+
+    A shard is either a window of dates or a range of issues. A date shard runs the search and work log retrieval for
+    its own date window, an issue which has work logs in several windows is retrieved once per window. For issue
+    shards the issues are searched once, after which every shard retrieves the work logs of its issues for the whole
+    date range. Either way the JSON decoding and the creation of the work logs scale with the number of processes. A
+    shard which fails is retried up to shard_retries times, without retrieving the other shards again. The sorted work
+    logs of the shards are merged into a single sorted list, and the metrics of the shards into the metrics given.
+
+    :param connection: a dict with the jira_url, user_name, api_token, ssl_certificate, rate_limit and max_retries, the
+    rate limit applies to every process
+    :param project The Jira project to retrieve the time report
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param period: the period of a date shard, month or week, or issues for issue shards
+    :param processes: the number of worker processes, None for the number of CPUs
+    :param workers: the number of issues per process for which the work logs are retrieved concurrently
+    :param authors: the account IDs or user names of the authors, None for all authors
+    :param shard_retries: the maximum number of retries of a failed shard
+    :param crawl: the function crawling a single shard, with the signature of crawl_shard
+    :param metrics: the metrics to add the requests of all shards to, None to record nothing
+    :return: a tuple of the index of issues keyed by issue key and the list of work logs sorted by author, started date
+    and issue key
+    """
+    to_date = to_date or date.today().isoformat()
+    if period == "issues":
+        with create_jira_client(connection, workers, metrics) as jira_client:
+            updated_issues = list(get_updated_issues(jira_client, project, from_date, to_date, authors).values())
+        if metrics:
+            metrics.count_scheduler(jira_client.scheduler)
+        number_of_shards = (processes or os.cpu_count() or 1) * ISSUE_SHARDS_PER_PROCESS
+        shards = [(from_date, to_date, issues) for issues in get_issue_shards(updated_issues, number_of_shards)]
+    else:
+        shards = [(shard_from, shard_to, None) for shard_from, shard_to in get_date_shards(from_date, to_date, period)]
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        def submit(index, attempt):
+            shard_from, shard_to, shard_issues = shards[index]
+            future = executor.submit(crawl, connection, project, shard_from, shard_to, workers, authors, shard_issues,
+                                     metrics is not None)
+            pending[future] = (index, attempt)
+
+        pending = {}
+        for index in range(len(shards)):
+            submit(index, 0)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, attempt = pending.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception:
+                    if attempt >= shard_retries:
+                        raise
+                    submit(index, attempt + 1)
+
+    issues = IssueIndex()
+    for index in range(len(shards)):
+        shard_issues, _, shard_metrics = results[index]
+        for issue in shard_issues:
+            issues.add(issue)
+        if metrics and shard_metrics:
+            metrics.merge(shard_metrics)
+    work_logs = list(heapq.merge(*(results[index][1] for index in range(len(shards))), key=WORK_LOG_ORDER))
+    return issues, work_logs
@@ -0,0 +1,64 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import unittest
+from urllib.parse import parse_qs, urlparse
+import asyncengine
+import jiratimereport
+from jiraclient import JiraClient
+
+
+class AsyncEngineTestCase(unittest.TestCase):
+
+    @unittest.skipUnless(asyncengine.httpx, "httpx is not installed")
+    def test_get_issues_and_work_logs_async(self):
+        """
+        Test the asynchronous engine against a local server, the result must be identical to the one of the search
+        engine
+        """
+        responses = {}
+        for name in ["issues_multiple_first_page", "issues_multiple_second_page", "work_logs_first_issue_one_page",
+                     "work_logs_second_issue_one_page"]:
+            with open(name + ".json", "rb") as response_file:
+                responses[name] = response_file.read()
+
+        class JiraHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/rest/api/2/search":
+                    start_at = parse_qs(url.query)['startAt'][0]
+                    body = responses["issues_multiple_first_page" if start_at == "0" else "issues_multiple_second_page"]
+                elif url.path == "/rest/api/2/issue/MYB-5/worklog/":
+                    body = responses["work_logs_first_issue_one_page"]
+                else:
+                    body = responses["work_logs_second_issue_one_page"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), JiraHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        jira_url = "http://127.0.0.1:" + str(server.server_port)
+        try:
+            issues, work_logs = asyncengine.get_issues_and_work_logs_async(jira_url, "user_name", "api_token", "",
+                                                                           "MYB", "2020-01-10", "2020-01-20", 4)
+            with JiraClient(jira_url, "user_name", "api_token", "") as jira_client:
+                expected_issues = jiratimereport.get_updated_issues(jira_client, "MYB", "2020-01-10", "2020-01-20")
+                expected_work_logs = jiratimereport.get_work_logs(jira_client, "2020-01-10", "2020-01-20",
+                                                                  expected_issues.values())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertListEqual(["MYB-5", "MYB-4", "MYB-6"], list(issues))
+        self.assertListEqual(list(expected_issues.values()), list(issues.values()), "Issues lists are unequal")
+        self.assertEqual(4, len(work_logs))
+        self.assertListEqual(expected_work_logs, work_logs, "Work Log lists are unequal")
+
+
+if __name__ == '__main__':
+    unittest.main()
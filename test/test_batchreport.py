@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import requests_mock
+import batchreport
+from jiraclient import JiraClient
+
+
+class BatchReportTestCase(unittest.TestCase):
+
+    def test_run_batch(self):
+        """
+        Test a batch of two overlapping jobs of the same project, the issues and work logs are retrieved once
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        with tempfile.TemporaryDirectory() as directory:
+            first_file_name = os.path.join(directory, "first.csv")
+            second_file_name = os.path.join(directory, "second.csv")
+            config_file_name = os.path.join(directory, "config.json")
+            with open(config_file_name, "w") as config_file:
+                json.dump({"jobs": [{"project": "MYB", "from_date": "2020-01-10", "to_date": "2020-01-15",
+                                     "output": "csv", "file_name": first_file_name},
+                                    {"project": "MYB", "from_date": "2020-01-13", "to_date": "2020-01-20",
+                                     "output": "csv", "file_name": second_file_name, "group_by": "author"}]},
+                          config_file)
+
+            jobs = batchreport.load_jobs(config_file_name)
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+                batchreport.run_batch(JiraClient("https://jira_url", "user_name", "api_token", ""), jobs)
+
+            self.assertEqual(3, m.call_count)
+            self.assertIn('worklogdate < "2020-01-21"', m.request_history[0].qs['jql'][0])
+
+            with open(first_file_name, "r") as first_file:
+                self.assertEqual(
+                    '"author","date","issue","time_spent","summary","parent","parent summary"\n'
+                    '"John Doe","2020-01-12","MYB-4","1:00:00","Summary of issue MYB-4","MYB-3",'
+                    '"Summary of the parent issue of MYB-4"\n',
+                    first_file.read())
+
+            with open(second_file_name, "r") as second_file:
+                self.assertEqual('"author","time_spent"\n"John Doe","2:30:00"\n', second_file.read())
+
+    def test_run_batch_teams(self):
+        """
+        Test a batch of jobs of two teams of the same project and a job of a disjoint date range, the jobs of the teams
+        share their retrieval and the disjoint date range is retrieved separately
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = [os.path.join(directory, name) for name in ["john.csv", "jane.csv", "march.csv"]]
+            config_file_name = os.path.join(directory, "config.json")
+            with open(config_file_name, "w") as config_file:
+                json.dump({"jobs": [{"project": "MYB", "from_date": "2020-01-10", "to_date": "2020-01-20",
+                                     "output": "csv", "file_name": file_names[0], "group_by": "author",
+                                     "authors": ["012345678901234567890123"]},
+                                    {"project": "MYB", "from_date": "2020-01-10", "to_date": "2020-01-20",
+                                     "output": "csv", "file_name": file_names[1], "group_by": "author",
+                                     "authors": ["jane"]},
+                                    {"project": "MYB", "from_date": "2020-03-01", "to_date": "2020-03-31",
+                                     "output": "csv", "file_name": file_names[2], "group_by": "author"}]},
+                          config_file)
+
+            jobs = batchreport.load_jobs(config_file_name)
+            self.assertEqual([[jobs[0], jobs[1]], [jobs[2]]],
+                             [group['jobs'] for group in batchreport.get_job_groups(jobs)])
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+                batchreport.run_batch(JiraClient("https://jira_url", "user_name", "api_token", ""), jobs,
+                                      parallel_jobs=1)
+
+            searches = [request.qs['jql'][0] for request in m.request_history if request.path == "/rest/api/2/search"]
+            self.assertEqual(6, m.call_count)
+            self.assertEqual(['project = "myb" and timespent is not null and worklogdate >= "2020-01-10" and '
+                              'worklogdate < "2020-01-21" and worklogauthor in ("012345678901234567890123","jane")',
+                              'project = "myb" and timespent is not null and worklogdate >= "2020-03-01" and '
+                              'worklogdate < "2020-04-01"'], searches)
+
+            reports = []
+            for file_name in file_names:
+                with open(file_name, "r") as report_file:
+                    reports.append(report_file.read())
+            self.assertEqual(['"author","time_spent"\n"John Doe","3:30:00"\n', '"author","time_spent"\n',
+                              '"author","time_spent"\n'], reports)
+
+    def test_load_jobs_invalid(self):
+        """
+        Test the validation of the jobs in the configuration file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            config_file_name = os.path.join(directory, "config.json")
+            with open(config_file_name, "w") as config_file:
+                json.dump({"jobs": [{"project": "MYB", "from_date": "2020-01-10", "output": "csv"}]}, config_file)
+
+            with self.assertRaisesRegex(ValueError, "Job 1 requires a file_name"):
+                batchreport.load_jobs(config_file_name)
+
+            with open(config_file_name, "w") as config_file:
+                json.dump({"jobs": [{"project": "MYB", "from_date": "2020-01-10", "output": "console",
+                                     "group_by": ""}]}, config_file)
+
+            with self.assertRaisesRegex(ValueError, "Invalid group by fields"):
+                batchreport.load_jobs(config_file_name)
+
+            with open(config_file_name, "w") as config_file:
+                json.dump({"jobs": [{"project": "MYB", "from_date": "2020-01-10", "output": "parquet",
+                                     "file_name": "report.parquet"}]}, config_file)
+
+            with mock.patch.object(batchreport, 'pyarrow', None):
+                with self.assertRaisesRegex(ValueError, "Job 1 has the parquet output: .* requires the pyarrow package"):
+                    batchreport.load_jobs(config_file_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
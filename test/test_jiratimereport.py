@@ -1,12 +1,51 @@
 import filecmp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
+import os
+import pickle
 import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
 import unittest
+from unittest import mock
+import zipfile
+import requests
 import requests_mock
+import aggregation
+from crawljournal import CrawlJournal, get_updated_issues_resumable, get_work_logs_resumable
 import jiratimereport
-from issue import Issue
-from worklog import WorkLog
-from datetime import datetime
+from issue import Issue, IssueIndex
+from jiraclient import JiraClient
+from jsondecoder import get_json_decoder, JSON_DECODERS
+from metrics import Metrics
+from requestscheduler import RequestScheduler
+import shardedcrawl
+from worklog import WorkLog, WorkLogBatch
+from worklogcache import WorkLogCache
+from datetime import date, datetime
+
+JIRA_CLIENT = JiraClient("https://jira_url", "user_name", "api_token", "")
+
+
+def crawl_shard_failing_once(connection, project, from_date, to_date, workers=1, authors=None, issues=None,
+                             measure=False):
+    """
+    Crawl a shard, failing the first attempt of every shard, the project is the directory to record the attempts in
+    """
+    attempt_file_name = os.path.join(project, from_date)
+    if not os.path.exists(attempt_file_name):
+        open(attempt_file_name, "w").close()
+        raise ConnectionError("The first attempt of shard " + from_date + " fails")
+
+    issue = Issue(10005, "MYB-5", "Summary of issue MYB-5", None, None)
+    started = datetime.strptime(from_date, "%Y-%m-%d")
+    metrics = Metrics() if measure else None
+    if metrics:
+        metrics.count("requests", 2)
+    return [issue], WorkLogBatch([WorkLog("MYB-5", started, 1800, "Jane Doe"),
+                                  WorkLog("MYB-5", started, 3600, "John Doe")]), metrics
 
 
 class MyTestCase(unittest.TestCase):
@@ -20,13 +59,12 @@ class MyTestCase(unittest.TestCase):
 
         with requests_mock.Mocker() as m:
             m.register_uri('GET', '/rest/api/2/search', text=mock_response)
-            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
-                                                       "2020-01-10", "2020-01-20", "")
+            issues = jiratimereport.get_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20")
 
         issues_expected_result = [
             Issue(10005, "MYB-5", "Summary of issue MYB-5", None, None)]
 
-        self.assertListEqual(issues_expected_result, issues, "Issues lists are unequal")
+        self.assertListEqual(issues_expected_result, list(issues.values()), "Issues lists are unequal")
 
     def test_convert_json_to_issues(self):
         """
@@ -52,14 +90,13 @@ class MyTestCase(unittest.TestCase):
 
         with requests_mock.Mocker() as m:
             m.register_uri('GET', '/rest/api/2/search', text=mock_response)
-            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
-                                                       "2020-01-10", "2020-01-20", "")
+            issues = jiratimereport.get_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20")
 
         issues_expected_result = [
             Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
             Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4")]
 
-        self.assertListEqual(issues_expected_result, issues, "Issues lists are unequal")
+        self.assertListEqual(issues_expected_result, list(issues.values()), "Issues lists are unequal")
 
     def test_get_updated_issues_multiple_pages(self):
         """
@@ -74,15 +111,14 @@ class MyTestCase(unittest.TestCase):
         with requests_mock.Mocker() as m:
             m.register_uri('GET', '/rest/api/2/search', [{'text': mock_response_first_page},
                                                          {'text': mock_response_second_page}])
-            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
-                                                       "2020-01-10", "2020-01-20", "")
+            issues = jiratimereport.get_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20")
 
         issues_expected_result = [
             Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
             Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4"),
             Issue(10006, "MYB-6", "Summary of issue MYB-6", "MYB-3", "Summary of the parent issue of MYB-6")]
 
-        self.assertListEqual(issues_expected_result, issues, "Issues lists are unequal")
+        self.assertListEqual(issues_expected_result, list(issues.values()), "Issues lists are unequal")
 
     def test_get_work_logs_one_page(self):
         """
@@ -100,8 +136,7 @@ class MyTestCase(unittest.TestCase):
         with requests_mock.Mocker() as m:
             m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
             m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
-            work_logs = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token",
-                                                     "2020-01-10", "2020-01-20", "", issues)
+            work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20", issues)
 
         work_logs_expected_result = [WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
                                      WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
@@ -124,8 +159,7 @@ class MyTestCase(unittest.TestCase):
         with requests_mock.Mocker() as m:
             m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', [{'text': mock_response_first_page},
                                                                        {'text': mock_response_second_page}])
-            work_logs = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token",
-                                                     "2020-01-10", "2020-01-20", "", issues)
+            work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20", issues)
 
         work_logs_expected_result = [WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
                                      WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
@@ -133,6 +167,422 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(work_logs_expected_result, work_logs, "Work Log lists are unequal")
 
+    def test_get_work_logs_narrowed(self):
+        """
+        Test the narrowing of the requests to the date range and the authors
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            issues = jiratimereport.get_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20",
+                                                       ["012345678901234567890123", "jane"])
+            search_request = m.last_request
+            work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20",
+                                                     [issues["MYB-5"]], authors=["012345678901234567890123"])
+            work_log_request = m.last_request
+            other_work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20",
+                                                           [issues["MYB-5"]], authors=["jane"])
+
+        self.assertEqual(['project = "myb" and timespent is not null and worklogdate >= "2020-01-10" and '
+                          'worklogdate < "2020-01-21" and worklogauthor in ("012345678901234567890123","jane")'],
+                         search_request.qs['jql'])
+        self.assertEqual(['1000'], search_request.qs['maxresults'])
+        self.assertEqual([str(int(datetime(2020, 1, 9).timestamp() * 1000))], work_log_request.qs['startedafter'])
+        self.assertEqual([str(int(datetime(2020, 1, 22).timestamp() * 1000))], work_log_request.qs['startedbefore'])
+        self.assertEqual(['5000'], work_log_request.qs['maxresults'])
+        self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                              WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe")],
+                             work_logs, "Work Log lists are unequal")
+        self.assertListEqual([], other_work_logs, "Work Log lists are unequal")
+
+    def test_get_work_logs_updated_by_other_author(self):
+        """
+        Test the narrowing to the authors of work logs which have been updated by another author
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_updated_by_other_author.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            issues = jiratimereport.get_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20")
+            work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20",
+                                                     [issues["MYB-5"]], authors=["123456789012345678901234"])
+            other_work_logs = jiratimereport.get_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20",
+                                                           [issues["MYB-5"]], authors=["012345678901234567890123"])
+
+        self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 18), 7200, "John Doe")],
+                             work_logs, "Work Log lists are unequal")
+        self.assertListEqual([], other_work_logs, "Work Log lists are unequal")
+
+    def test_get_work_logs_bulk(self):
+        """
+        Test the bulk retrieval of Jira work logs, work logs outside the date range or the project are skipped
+        """
+        with open("work_logs_updated.json", "r") as updated_file:
+            mock_response_updated = updated_file.read()
+
+        with open("work_logs_list.json", "r") as list_file:
+            mock_response_list = list_file.read()
+
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/worklog/updated', text=mock_response_updated)
+            m.register_uri('POST', '/rest/api/2/worklog/list', text=mock_response_list)
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            issues, work_logs = jiratimereport.get_work_logs_bulk(JIRA_CLIENT, "MYB", "2020-01-10", "2020-01-20")
+            list_request = next(request for request in m.request_history if request.method == 'POST')
+            search_request = next(request for request in m.request_history if request.path == '/rest/api/2/search')
+
+        self.assertEqual({'ids': [10001, 10002, 10000, 10003, 10004]}, list_request.json())
+        self.assertEqual(['project = "myb" and id in (10005,10004,10009)'], search_request.qs['jql'])
+
+        issues_expected_result = [
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4")]
+        work_logs_expected_result = [WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                                     WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        self.assertListEqual(issues_expected_result, list(issues.values()), "Issues lists are unequal")
+        self.assertListEqual(work_logs_expected_result, work_logs, "Work Log lists are unequal")
+
+    def test_sync_work_log_cache(self):
+        """
+        Test the synchronization of the work log cache, the second synchronization only retrieves the changes
+        """
+        with open("work_logs_updated.json", "r") as updated_file:
+            mock_response_updated = updated_file.read()
+
+        with open("work_logs_list.json", "r") as list_file:
+            mock_response_list = list_file.read()
+
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_deleted.json", "r") as deleted_file:
+            mock_response_deleted = deleted_file.read()
+
+        no_changes = {'values': [], 'since': 1579530207142, 'until': 1579612800000, 'lastPage': True}
+
+        with WorkLogCache(":memory:") as cache:
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/worklog/updated', text=mock_response_updated)
+                m.register_uri('POST', '/rest/api/2/worklog/list', text=mock_response_list)
+                m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+                m.register_uri('GET', '/rest/api/2/worklog/deleted', json=no_changes)
+                jiratimereport.sync_work_log_cache(JIRA_CLIENT, cache, "2020-01-10")
+
+            issues, work_logs = cache.get_issues_and_work_logs("MYB", datetime(2020, 1, 10), datetime(2020, 1, 21))
+            self.assertListEqual([
+                Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4"),
+                Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5")],
+                list(issues.values()), "Issues lists are unequal")
+            self.assertListEqual([WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe"),
+                                  WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                                  WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe")],
+                                 work_logs, "Work Log lists are unequal")
+
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/worklog/updated', json=no_changes)
+                m.register_uri('GET', '/rest/api/2/worklog/deleted', text=mock_response_deleted)
+                jiratimereport.sync_work_log_cache(JIRA_CLIENT, cache, "2020-01-10")
+
+            self.assertEqual(2, m.call_count)
+            self.assertEqual(['1579530207142'], m.request_history[0].qs['since'])
+            _, work_logs = cache.get_issues_and_work_logs("MYB", datetime(2020, 1, 10), datetime(2020, 1, 21))
+            self.assertListEqual([WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe"),
+                                  WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe")],
+                                 work_logs, "Work Log lists are unequal")
+
+    def test_get_project_key(self):
+        """
+        Test the resolution of a project to its key for the work log cache, a project name is not accepted
+        """
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/project/myb', json={'id': "10000", 'key': "MYB", 'name': "My Board"})
+            m.register_uri('GET', '/rest/api/2/project/My%20Board', status_code=404,
+                           json={'errorMessages': ["No project could be found with key 'My Board'."]})
+            self.assertEqual("MYB", jiratimereport.get_project_key(JIRA_CLIENT, "myb"))
+            with self.assertRaisesRegex(ValueError, "the cache requires the key of the project"):
+                jiratimereport.get_project_key(JIRA_CLIENT, "My Board")
+
+    def test_request_scheduler_retry(self):
+        """
+        Test the retry of throttled and failed requests, respecting the Retry-After header
+        """
+        with open("issues_without_parent.json", "r") as issues_file:
+            mock_response = issues_file.read()
+
+        delays = []
+        scheduler = RequestScheduler(max_retries=2, backoff=0.5, sleep=delays.append)
+        jira_client = JiraClient("https://jira_url", "user_name", "api_token", "", scheduler=scheduler)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', [{'status_code': 429, 'headers': {'Retry-After': '3'}},
+                                                         {'status_code': 503},
+                                                         {'text': mock_response}])
+            issues = jiratimereport.get_updated_issues(jira_client, "MYB", "2020-01-10", "2020-01-20")
+
+        self.assertListEqual([Issue(10005, "MYB-5", "Summary of issue MYB-5", None, None)], list(issues.values()))
+        self.assertListEqual([3.0, 1.0], delays)
+        self.assertEqual((3, 2, 4.0), (scheduler.requests, scheduler.retries, scheduler.throttle_time))
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', status_code=503)
+            with self.assertRaises(requests.HTTPError):
+                jiratimereport.get_updated_issues(jira_client, "MYB", "2020-01-10", "2020-01-20")
+            self.assertEqual(3, m.call_count)
+
+    def test_request_scheduler_rate_limit(self):
+        """
+        Test the token bucket rate limit of the request scheduler
+        """
+        clock = [0.0]
+        delays = []
+
+        def sleep(delay):
+            delays.append(delay)
+            clock[0] += delay
+
+        scheduler = RequestScheduler(rate_limit=2, sleep=sleep, clock=lambda: clock[0])
+        for _ in range(4):
+            scheduler.execute(lambda: SimpleNamespace(status_code=200))
+
+        self.assertListEqual([0.5, 0.5], delays)
+
+    def test_metrics(self):
+        """
+        Test the metrics per phase and per endpoint, including a retried request
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            issues_response = issues_file.read()
+        with open("work_logs_first_issue_one_page.json", "r") as work_logs_file:
+            work_logs_response = work_logs_file.read()
+
+        clock = [0.0]
+
+        def tick():
+            clock[0] += 0.02
+            return clock[0]
+
+        metrics = Metrics(clock=tick)
+        scheduler = RequestScheduler(sleep=lambda delay: None)
+        jira_client = JiraClient("https://jira_url", "user_name", "api_token", "", scheduler=scheduler,
+                                 metrics=metrics)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', [{'status_code': 503}, {'text': issues_response}])
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=work_logs_response)
+            with metrics.phase("search_issues"):
+                issues = jiratimereport.get_updated_issues(jira_client, "MYB", "2020-01-10", "2020-01-20")
+            jiratimereport.get_work_logs(jira_client, "2020-01-10", "2020-01-20", [issues["MYB-5"]])
+
+        summary = json.loads(metrics.to_json())
+        self.assertListEqual(["search_issues"], list(summary['phases']))
+        search = summary['endpoints']['/rest/api/2/search']
+        self.assertEqual((2, 1, len(issues_response)), (search['requests'], search['errors'], search['bytes']))
+        self.assertEqual({'0.005': 0, '0.01': 0, '0.025': 2, '0.05': 2}, {bucket: count for bucket, count in
+                                                                          search['latency']['buckets'].items()
+                                                                          if float(bucket) <= 0.05})
+        work_logs = summary['endpoints']['/rest/api/2/issue/{key}/worklog']
+        self.assertEqual((1, 0), (work_logs['requests'], work_logs['errors']))
+
+        prometheus = metrics.to_prometheus()
+        self.assertIn('jiratimereport_requests_total{endpoint="/rest/api/2/search"} 2\n', prometheus)
+        self.assertIn('jiratimereport_request_duration_seconds_bucket{endpoint="/rest/api/2/search",le="+Inf"} 2\n',
+                      prometheus)
+
+        merged_metrics = Metrics()
+        merged_metrics.merge(pickle.loads(pickle.dumps(metrics)))
+        merged_metrics.merge(metrics)
+        merged_search = merged_metrics.endpoints['/rest/api/2/search']
+        self.assertEqual((4, 2, 2 * len(issues_response)),
+                         (merged_search['requests'], merged_search['errors'], merged_search['bytes']))
+        self.assertEqual(4, merged_search['latency_buckets'][2])
+
+    def test_shards(self):
+        """
+        Test the splitting into date and issue shards
+        """
+        self.assertListEqual([("2020-01-20", "2020-01-31"), ("2020-02-01", "2020-02-29"), ("2020-03-01", "2020-03-05")],
+                             shardedcrawl.get_date_shards("2020-01-20", "2020-03-05", "month"))
+        self.assertListEqual([("2020-01-01", "2020-01-07"), ("2020-01-08", "2020-01-10")],
+                             shardedcrawl.get_date_shards("2020-01-01", "2020-01-10", "week"))
+        self.assertListEqual([[1, 2, 3], [4, 5, 6], [7]], shardedcrawl.get_issue_shards([1, 2, 3, 4, 5, 6, 7], 3))
+        with self.assertRaises(ValueError):
+            shardedcrawl.get_date_shards("2020-01-01", "2020-01-10", "day")
+
+    def test_get_work_logs_sharded_retry(self):
+        """
+        Test that a failed shard is retried and the work logs of all shards are merged in sorted order
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = Metrics()
+            issues, work_logs = shardedcrawl.get_work_logs_sharded({}, directory, "2020-01-20", "2020-02-10", "month",
+                                                                   processes=2, crawl=crawl_shard_failing_once,
+                                                                   metrics=metrics)
+            self.assertListEqual(["2020-01-20", "2020-02-01"], sorted(os.listdir(directory)))
+
+        self.assertEqual({'requests': 4}, metrics.counters)
+        self.assertListEqual(["MYB-5"], list(issues))
+        self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 20), 1800, "Jane Doe"),
+                              WorkLog("MYB-5", datetime(2020, 2, 1), 1800, "Jane Doe"),
+                              WorkLog("MYB-5", datetime(2020, 1, 20), 3600, "John Doe"),
+                              WorkLog("MYB-5", datetime(2020, 2, 1), 3600, "John Doe")], work_logs)
+
+    def test_resume_crawl(self):
+        """
+        Test that an interrupted crawl resumes at the next search page and only retrieves the remaining work logs
+        """
+        with open("issues_multiple_first_page.json", "r") as issues_first_file:
+            mock_response_first_page = issues_first_file.read()
+        with open("issues_multiple_second_page.json", "r") as issues_second_file:
+            mock_response_second_page = issues_second_file.read()
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        jira_client = JiraClient("https://jira_url", "user_name", "api_token", "",
+                                 scheduler=RequestScheduler(max_retries=0))
+        settings = {'project': "MYB", 'from_date': "2020-01-10", 'to_date': "2020-01-20"}
+
+        def crawl(journal_file_name):
+            with CrawlJournal(journal_file_name, settings, resume=True) as journal:
+                issues = get_updated_issues_resumable(jira_client, journal, "MYB", "2020-01-10", "2020-01-20")
+                return get_work_logs_resumable(jira_client, journal, "2020-01-10", "2020-01-20",
+                                               list(issues.values()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            journal_file_name = os.path.join(directory, "journal.jsonl")
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/search', [{'text': mock_response_first_page}, {'status_code': 502}])
+                with self.assertRaises(requests.HTTPError):
+                    crawl(journal_file_name)
+
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/search', text=mock_response_second_page)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', status_code=502)
+                with self.assertRaises(requests.HTTPError):
+                    crawl(journal_file_name)
+                self.assertEqual(['2'], m.request_history[0].qs['startat'])
+
+            with open(journal_file_name, "ab") as journal_file:
+                journal_file.write(b'{"issue_key":"MYB-4","work_lo')
+
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-6/worklog/', text='{"startAt": 0, "maxResults": 1, '
+                                                                             '"total": 0, "worklogs": []}')
+                work_logs = crawl(journal_file_name)
+                self.assertListEqual(["/rest/api/2/issue/myb-4/worklog/", "/rest/api/2/issue/myb-6/worklog/"],
+                                     [request.path for request in m.request_history])
+
+            with self.assertRaises(ValueError):
+                CrawlJournal(journal_file_name, dict(settings, project="OTHER"), resume=True)
+
+        self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                              WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                              WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe")], work_logs)
+
+    def test_get_work_logs_concurrent(self):
+        """
+        Test the concurrent retrieval of Jira work logs against a local server, the result must be identical and the
+        elapsed time must decrease
+        """
+        with open("work_logs_first_issue_one_page.json", "rb") as first_issue_file:
+            mock_response = first_issue_file.read()
+
+        class DelayedWorkLogHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(0.05)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(mock_response)))
+                self.end_headers()
+                self.wfile.write(mock_response)
+
+            def log_message(self, format, *args):
+                pass
+
+        issues = [Issue(10000 + i, "MYB-" + str(i), "Summary of issue MYB-" + str(i), None, None) for i in range(8)]
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), DelayedWorkLogHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        elapsed_times = []
+        results = []
+        try:
+            for workers in [1, 4]:
+                with JiraClient("http://127.0.0.1:" + str(server.server_port), "user_name", "api_token", "",
+                                pool_size=workers) as jira_client:
+                    start = time.perf_counter()
+                    results.append(jiratimereport.get_work_logs(jira_client, "2020-01-10", "2020-01-20", issues,
+                                                                workers))
+                    elapsed_times.append(time.perf_counter() - start)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertListEqual(results[0], results[1], "Work Log lists are unequal")
+        self.assertEqual(["MYB-" + str(i) for i in range(8) for _ in range(2)],
+                         [work_log.issue_key for work_log in results[1]])
+        self.assertLess(elapsed_times[1], elapsed_times[0])
+
+    def test_json_decoders(self):
+        """
+        Test that every installed JSON decoder returns the same work logs as the json module
+        """
+        with open("work_logs_first_issue_one_page.json", "r") as work_logs_file:
+            mock_response = work_logs_file.read()
+
+        issues = [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5")]
+        work_logs_per_decoder = {}
+        for name, decoder in JSON_DECODERS.items():
+            if decoder is None:
+                continue
+            jira_client = JiraClient("https://jira_url", "user_name", "api_token", "", json_decoder=decoder)
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response)
+                work_logs_per_decoder[name] = jiratimereport.get_work_logs(jira_client, "2020-01-10", "2020-01-20",
+                                                                           issues)
+
+        for name, work_logs in work_logs_per_decoder.items():
+            self.assertListEqual(work_logs_per_decoder['json'], work_logs, "Work logs of " + name + " are unequal")
+        first_work_log, second_work_log = work_logs_per_decoder['json']
+        self.assertIs(first_work_log.started, second_work_log.started)
+
+        with self.assertRaises(ValueError):
+            get_json_decoder("yaml")
+
+    def test_work_log_batch(self):
+        """
+        Test the conversion of work logs into the columnar batch and back
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 5400, "John Doe")]
+
+        batch = WorkLogBatch(work_logs)
+
+        self.assertEqual(3, len(batch))
+        self.assertEqual(["MYB-7", "MYB-5"], batch.issue_keys)
+        self.assertEqual(["René Doe", "John Doe"], batch.authors)
+        self.assertEqual(work_logs[2], batch[2])
+        self.assertListEqual(work_logs, list(batch), "Work Log lists are unequal")
+
     def test_output(self):
         """
         Test the different outputs including UTF-16 characters and issue without parent issue
@@ -142,8 +592,9 @@ class MyTestCase(unittest.TestCase):
                      WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
                      WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
 
-        issues = [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
-                  Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)]
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)])
 
         stdout = sys.stdout
         with open('jira-time-report-console.txt', 'w') as sys.stdout:
@@ -155,7 +606,175 @@ class MyTestCase(unittest.TestCase):
         self.assertTrue(filecmp.cmp('csv_output.csv', 'jira-time-report.csv'))
 
         jiratimereport.process_work_logs("excel", issues, work_logs)
-        self.assertTrue(filecmp.cmp('excel_output.xlsx', 'excel_output.xlsx'))
+        with zipfile.ZipFile('jira-time-report.xlsx') as excel_file:
+            worksheet = excel_file.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(4, worksheet.count('<row '))
+        self.assertIn('<is><t>René Doe</t></is>', worksheet)
+        self.assertIn('<v>43842</v>', worksheet)
+        self.assertIn('<v>0.0625</v>', worksheet)
+
+    def test_output_jsonl(self):
+        """
+        Test the JSON Lines output with the time spent in seconds
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 5400, "John Doe")]
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)])
+
+        jiratimereport.process_work_logs("jsonl", issues, work_logs)
+
+        with open("jira-time-report.jsonl", "r", encoding="utf-8") as jsonl_file:
+            self.assertListEqual([{"author": "John Doe", "date": "2020-01-12", "issue": "MYB-5", "time_spent": 5400,
+                                   "summary": "Summary of issue MYB-5", "parent": "MYB-3",
+                                   "parent_summary": "Summary of the parent issue of MYB-5"},
+                                  {"author": "René Doe", "date": "2020-01-20", "issue": "MYB-7", "time_spent": 3600,
+                                   "summary": "Summary of issue MYB-7", "parent": None, "parent_summary": None}],
+                                 [json.loads(line) for line in jsonl_file])
+
+    @unittest.skipUnless(jiratimereport.pyarrow, "pyarrow is not installed")
+    def test_output_parquet(self):
+        """
+        Test the Parquet output written in multiple row groups with typed and dictionary encoded columns
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 5400, "John Doe")]
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)])
+
+        with mock.patch.object(jiratimereport, 'PARQUET_BATCH_SIZE', 2):
+            jiratimereport.process_work_logs("parquet", issues, work_logs)
+
+        parquet_file = jiratimereport.pyarrow.parquet.ParquetFile("jira-time-report.parquet")
+        table = parquet_file.read()
+        self.assertEqual(2, parquet_file.num_row_groups)
+        self.assertEqual("dictionary<values=string, indices=int32, ordered=0>", str(table.schema.field("author").type))
+        self.assertListEqual(["John Doe", "John Doe", "René Doe"], table.column("author").to_pylist())
+        self.assertListEqual([date(2020, 1, 12), date(2020, 1, 18), date(2020, 1, 20)],
+                             table.column("date").to_pylist())
+        self.assertListEqual([5400, 3600, 3600], table.column("time_spent").to_pylist())
+        self.assertListEqual(["MYB-3", "MYB-3", None], table.column("parent").to_pylist())
+
+    def test_output_excel_multiple_worksheets(self):
+        """
+        Test the continuation of the Excel output in a next worksheet when the row limit is exceeded
+        """
+        work_logs = [WorkLog("MYB-5", datetime(2020, 1, day), 3600, "John Doe") for day in range(10, 15)]
+        issues = IssueIndex([Issue(10005, "MYB-5", "Summary of issue MYB-5", None, None)])
+
+        with mock.patch.object(jiratimereport, 'EXCEL_MAX_ROWS', 2):
+            jiratimereport.process_work_logs("excel", issues, work_logs)
+
+        with zipfile.ZipFile('jira-time-report.xlsx') as excel_file:
+            worksheets = [excel_file.read('xl/worksheets/sheet' + str(number) + '.xml').decode('utf-8')
+                          for number in range(1, 4)]
+        self.assertListEqual([2, 2, 1], [worksheet.count('<row ') for worksheet in worksheets])
+
+    def test_output_external_sort(self):
+        """
+        Test the output of streamed work logs sorted by means of an external merge sort spilling to disk
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)])
+
+        stdout = sys.stdout
+        with open('jira-time-report-console.txt', 'w') as sys.stdout:
+            jiratimereport.process_work_logs("console", issues, iter(work_logs), 2)
+        sys.stdout = stdout
+        self.assertTrue(filecmp.cmp('console_output.txt', 'jira-time-report-console.txt'))
+
+        # The work logs of the same author, day and issue are ordered on the time spent, whatever the retrieval order
+        with open('jira-time-report-console.txt', 'w') as sys.stdout:
+            jiratimereport.process_work_logs("console", issues, reversed(work_logs), 2)
+        sys.stdout = stdout
+        self.assertTrue(filecmp.cmp('console_output.txt', 'jira-time-report-console.txt'))
+
+    def test_iter_work_logs_streaming(self):
+        """
+        Test the streaming of work logs, the issues are indexed while the work logs are retrieved
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        issues = IssueIndex()
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            updated_issues = issues.indexing(jiratimereport.iter_updated_issues(JIRA_CLIENT, "MYB", "2020-01-10",
+                                                                                "2020-01-20"))
+            work_logs = jiratimereport.iter_work_logs(JIRA_CLIENT, "2020-01-10", "2020-01-20", updated_issues)
+
+            self.assertEqual(0, m.call_count)
+            self.assertEqual(WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"), next(work_logs))
+            self.assertEqual(2, m.call_count)
+            self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                                  WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe")],
+                                 list(work_logs), "Work Log lists are unequal")
+
+        self.assertListEqual(["MYB-5", "MYB-4"], list(issues))
+
+    def test_aggregate_work_logs(self):
+        """
+        Test the aggregation of work logs per group and the pivot of work logs per author and day
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5"),
+            Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None)])
+
+        self.assertListEqual([(("John Doe", "MYB-3", "2020-W02"), 3600),
+                              (("John Doe", "MYB-3", "2020-W03"), 9000),
+                              (("René Doe", "", "2020-W04"), 3600)],
+                             aggregation.aggregate_work_logs(issues, work_logs, ["author", "parent", "week"]))
+
+        jiratimereport.process_aggregated_work_logs("csv", issues, work_logs, ["author"], "day")
+        with open("jira-time-report.csv", "r") as csv_file:
+            self.assertEqual(
+                '"author","2020-01-12","2020-01-18","2020-01-20","total"\n'
+                '"John Doe","1:00:00","2:30:00","","3:30:00"\n'
+                '"René Doe","","","1:00:00","1:00:00"\n',
+                csv_file.read())
+
+        jiratimereport.process_aggregated_work_logs("excel", issues, work_logs, ["author"], "day")
+        with zipfile.ZipFile('jira-time-report.xlsx') as excel_file:
+            worksheet = excel_file.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('<is><t>René Doe</t></is>', worksheet)
+        self.assertIn('<c r="C2" s="1"><v>0.1041666666666667</v>', worksheet)
+        self.assertNotIn('<t>3:30:00</t>', worksheet)
+
+        with self.assertRaises(ValueError):
+            aggregation.parse_group_by("author,year")
+
+    def test_output_missing_issue(self):
+        """
+        Test the output of a work log of an issue which has not been retrieved
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe")]
+        issues = IssueIndex([
+            Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5")])
+
+        with self.assertRaisesRegex(KeyError, "Issue MYB-7 referenced by a work log has not been retrieved"):
+            jiratimereport.process_work_logs("csv", issues, work_logs)
 
 
 if __name__ == '__main__':
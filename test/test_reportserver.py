@@ -0,0 +1,124 @@
+from datetime import datetime
+import json
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import requests_mock
+from jiraclient import JiraClient
+import reportserver
+from worklog import WorkLog
+from worklogcache import WorkLogCache
+
+
+class ReportServerTestCase(unittest.TestCase):
+
+    def test_select(self):
+        """
+        Test the selection of the work logs of a date range and authors from the index of a project
+        """
+        work_logs = [WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "Jane Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 20), 5400, "John Doe")]
+        project_work_logs = reportserver.ProjectWorkLogs({}, work_logs)
+
+        self.assertListEqual([work_logs[1], work_logs[0]],
+                             project_work_logs.select(datetime(2020, 1, 12), datetime(2020, 1, 20)))
+        self.assertListEqual([work_logs[0], work_logs[2]],
+                             project_work_logs.select(datetime(2020, 1, 1), datetime(2020, 2, 1), ["John Doe"]))
+        self.assertListEqual([], project_work_logs.select(datetime(2020, 1, 1), datetime(2020, 2, 1), ["Nobody"]))
+
+    def test_serve_reports(self):
+        """
+        Test the refresh of the index from Jira and serving reports for a sub range from the index
+        """
+        with open("work_logs_updated.json", "r") as updated_file:
+            mock_response_updated = updated_file.read()
+
+        with open("work_logs_list.json", "r") as list_file:
+            mock_response_list = list_file.read()
+
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        no_changes = {'values': [], 'since': 1579530207142, 'until': 1579612800000, 'lastPage': True}
+
+        index = reportserver.ReportIndex()
+        with WorkLogCache(":memory:") as cache, requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/worklog/updated', text=mock_response_updated)
+            m.register_uri('POST', '/rest/api/2/worklog/list', text=mock_response_list)
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            m.register_uri('GET', '/rest/api/2/worklog/deleted', json=no_changes)
+            reportserver.refresh_index(JiraClient("https://jira_url", "user_name", "api_token", ""), cache, index,
+                                       ["MYB"], "2020-01-10")
+
+        server = reportserver.create_server(index, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:" + str(server.server_port)
+        try:
+            with urlopen(url + "/report?project=MYB&from_date=2020-01-13&to_date=2020-01-20&output=csv") as response:
+                self.assertEqual("text/csv; charset=utf-8", response.headers['Content-Type'])
+                self.assertEqual(
+                    '"author","date","issue","time_spent","summary","parent","parent summary"\n'
+                    '"John Doe","2020-01-18","MYB-5","1:00:00","Summary of issue MYB-5","MYB-3",'
+                    '"Summary of the parent issue of MYB-5"\n'
+                    '"John Doe","2020-01-18","MYB-5","1:30:00","Summary of issue MYB-5","MYB-3",'
+                    '"Summary of the parent issue of MYB-5"\n',
+                    response.read().decode("utf-8").replace("\r\n", "\n"))
+
+            with urlopen(url + "/report?project=MYB&from_date=2020-01-10&group_by=issue") as response:
+                self.assertIn("MYB-4;1:00:00", response.read().decode("utf-8"))
+
+            with urlopen(url + "/status") as response:
+                status = json.loads(response.read())
+                self.assertEqual({'MYB': {'issues': 2, 'work_logs': 3}}, status['projects'])
+                self.assertEqual("2020-01-10", status['from_date'])
+
+            with self.assertRaises(HTTPError) as context:
+                urlopen(url + "/report?project=OTHER&from_date=2020-01-10")
+            self.assertEqual(400, context.exception.code)
+
+            with self.assertRaises(HTTPError) as context:
+                urlopen(url + "/report?project=MYB&from_date=2020-01-01")
+            self.assertEqual(400, context.exception.code)
+            self.assertIn("must not be before 2020-01-10", json.loads(context.exception.read())['error'])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_refresh_failure(self):
+        """
+        Test that the refreshes continue after a refresh failed on an unexpected payload, and the error is reported
+        """
+        with open("work_logs_updated.json", "r") as updated_file:
+            mock_response_updated = updated_file.read()
+
+        index = reportserver.ReportIndex()
+        ready = threading.Event()
+        stop = threading.Event()
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/worklog/updated', [{'json': {'unexpected': True}},
+                                                                  {'text': mock_response_updated}])
+            m.register_uri('POST', '/rest/api/2/worklog/list', json=[])
+            m.register_uri('GET', '/rest/api/2/worklog/deleted', json={'values': [], 'lastPage': True,
+                                                                       'until': 1579612800000})
+            refresher = threading.Thread(target=reportserver.refresh_periodically,
+                                         args=(JiraClient("https://jira_url", "user_name", "api_token", ""),
+                                               ":memory:", index, ["MYB"], "2020-01-10", 0.01, ready, stop))
+            refresher.start()
+            ready.wait()
+            self.assertIn("KeyError", index.refresh_error)
+            for _ in range(500):
+                if index.last_refresh:
+                    break
+                stop.wait(0.01)
+            stop.set()
+            refresher.join()
+
+        self.assertIsNotNone(index.last_refresh)
+        self.assertIsNone(index.refresh_error)
+        self.assertEqual({'MYB': {'issues': 0, 'work_logs': 0}}, index.get_status()['projects'])
+
+
+if __name__ == '__main__':
+    unittest.main()
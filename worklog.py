@@ -1,11 +1,23 @@
+from array import array
+from datetime import datetime
+from functools import lru_cache
+import sys
+
+DATE_CACHE_SIZE = 4096
+
+
 class WorkLog:
     """A WorkLog object will represent a Jira WorkLog containing the registered time on an issue by an author
+
+    The issue key and author are interned, so the many work logs of an issue or author share a single string.
     """
+    __slots__ = ('issue_key', 'started', 'time_spent', 'author')
+
     def __init__(self, issue_key, started, time_spent, author):
-        self.issue_key = issue_key
+        self.issue_key = sys.intern(issue_key)
         self.started = started
         self.time_spent = time_spent
-        self.author = author
+        self.author = sys.intern(author)
 
     def __eq__(self, other):
         try:
@@ -13,3 +25,75 @@ class WorkLog:
                    (other.issue_key, other.started, other.time_spent, other.author)
         except AttributeError:
             return NotImplemented
+
+
+class WorkLogBatch:
+    """A WorkLogBatch object will hold many work logs in a compact columnar form
+
+    The issue keys and authors are dictionary encoded, the started dates are stored as day ordinals and the time spent
+    as integers, each column in an array. Work logs are converted back into WorkLog objects when iterating.
+    """
+    def __init__(self, work_logs=()):
+        """
+        :param work_logs: the work logs to add to the batch
+        """
+        self.issue_keys = []
+        self.authors = []
+        self.issue_key_codes = {}
+        self.author_codes = {}
+        self.issue_key_column = array('L')
+        self.started_column = array('l')
+        self.time_spent_column = array('q')
+        self.author_column = array('L')
+        self.extend(work_logs)
+
+    def append(self, work_log):
+        """Add a work log to the batch
+
+        :param work_log: the work log to add
+        """
+        self.issue_key_column.append(self.encode(work_log.issue_key, self.issue_keys, self.issue_key_codes))
+        self.started_column.append(work_log.started.toordinal())
+        self.time_spent_column.append(work_log.time_spent)
+        self.author_column.append(self.encode(work_log.author, self.authors, self.author_codes))
+
+    def extend(self, work_logs):
+        """Add work logs to the batch
+
+        :param work_logs: the iterable of work logs to add
+        """
+        for work_log in work_logs:
+            self.append(work_log)
+
+    @staticmethod
+    def encode(value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.started_column)
+
+    def __getitem__(self, index):
+        return WorkLog(self.issue_keys[self.issue_key_column[index]],
+                       datetime.fromordinal(self.started_column[index]),
+                       self.time_spent_column[index],
+                       self.authors[self.author_column[index]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(day):
+    """Parse a date, memoised as a report only covers a limited number of distinct days
+
+    The work logs of the same day share the parsed datetime, which is immutable.
+
+    :param day: the date, format yyyy-mm-dd
+    :return: the date as a datetime at time 00:00:00
+    """
+    return datetime.strptime(day, "%Y-%m-%d")
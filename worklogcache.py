@@ -0,0 +1,132 @@
+import sqlite3
+
+from issue import Issue, IssueIndex
+from worklog import parse_date, WorkLog
+
+
+class WorkLogCache:
+    """A WorkLogCache object will hold the work logs and issues retrieved from Jira in a local SQLite database
+
+    Next to the work logs and issues, the cache holds the watermark of the last synchronization, so a next run only needs
+    to retrieve the changes since then.
+    """
+    def __init__(self, file_name):
+        """
+        :param file_name: The location of the SQLite database, ":memory:" for a cache which is not persisted
+        """
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS work_logs (
+                work_log_id INTEGER PRIMARY KEY,
+                issue_id INTEGER NOT NULL,
+                started TEXT NOT NULL,
+                time_spent INTEGER NOT NULL,
+                author TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS work_logs_started ON work_logs (started);
+            CREATE TABLE IF NOT EXISTS issues (
+                issue_id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL,
+                project TEXT NOT NULL,
+                summary TEXT,
+                parent_key TEXT,
+                parent_summary TEXT
+            );
+            CREATE TABLE IF NOT EXISTS watermark (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                synced_from INTEGER NOT NULL,
+                since INTEGER NOT NULL
+            );
+        """)
+
+    def get_watermark(self):
+        """Get the watermark of the last synchronization
+
+        :return: a tuple of the moment from which the cache has been filled and the moment until which the cache has been
+        synchronized, both in milliseconds since the epoch, or a tuple of None when the cache has never been synchronized
+        """
+        row = self.connection.execute("SELECT synced_from, since FROM watermark").fetchone()
+        return row if row else (None, None)
+
+    def set_watermark(self, synced_from, since):
+        """Set the watermark of the last synchronization
+
+        :param synced_from: the moment from which the cache has been filled in milliseconds since the epoch
+        :param since: the moment until which the cache has been synchronized in milliseconds since the epoch
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO watermark (id, synced_from, since) VALUES (0, ?, ?)",
+                                    (synced_from, since))
+
+    def store_work_logs(self, work_logs_json):
+        """Store or replace work logs
+
+        :param work_logs_json: the list of work logs as JSON as received from Jira
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO work_logs (work_log_id, issue_id, started, time_spent, author) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((int(work_log_json['id']),
+                  int(work_log_json['issueId']),
+                  work_log_json['started'][0:10],
+                  int(work_log_json['timeSpentSeconds']),
+                  work_log_json['updateAuthor']['displayName']) for work_log_json in work_logs_json))
+
+    def delete_work_logs(self, work_log_ids):
+        """Delete work logs
+
+        :param work_log_ids: the list of work log IDs which have been deleted
+        """
+        with self.connection:
+            self.connection.executemany("DELETE FROM work_logs WHERE work_log_id = ?",
+                                        ((work_log_id,) for work_log_id in work_log_ids))
+
+    def store_issues(self, issues):
+        """Store or replace issues
+
+        The project of an issue is derived from its key.
+
+        :param issues: the list of issues
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO issues (issue_id, key, project, summary, parent_key, parent_summary) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((issue.issue_id, issue.key, issue.key.rsplit('-', 1)[0], issue.summary, issue.parent_key,
+                  issue.parent_summary) for issue in issues))
+
+    def get_issues_and_work_logs(self, project, from_date, to_date):
+        """Get the issues and work logs of a project which have been started between the from and to date
+
+        :param project The key of the Jira project
+        :param from_date The date to start the time report as a datetime
+        :param to_date The date to end the time report (exclusive) as a datetime
+        :return: a tuple of the index of issues keyed by issue key and the list of work logs
+        """
+        rows = self.connection.execute(
+            "SELECT i.issue_id, i.key, i.summary, i.parent_key, i.parent_summary, w.started, w.time_spent, w.author "
+            "FROM work_logs w JOIN issues i ON i.issue_id = w.issue_id "
+            "WHERE i.project = ? AND w.started >= ? AND w.started < ? "
+            "ORDER BY w.work_log_id",
+            (project, from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d")))
+
+        issues = IssueIndex()
+        work_logs = []
+        for issue_id, key, summary, parent_key, parent_summary, started, time_spent, author in rows:
+            if key not in issues:
+                issues.add(Issue(issue_id, key, summary, parent_key, parent_summary))
+            work_logs.append(WorkLog(key, parse_date(started), time_spent, author))
+
+        return issues, work_logs
+
+    def close(self):
+        """Close the database connection
+        """
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()